@@ -0,0 +1,29 @@
+import time
+
+import numpy as np
+
+from force_awakens.mechanics.broad_phase import all_pairs, candidate_pairs
+
+# compare the spatial hash broad phase against testing every pair,
+# for bodies spread like the simulation's, merging at d < 0.05
+r = 0.05
+
+for n in (64, 1024, 8192, 32768):
+    s = np.random.uniform(-10, 10, (n, 3))
+
+    # plant a few close pairs
+    s[1::50] = s[::50][: len(s[1::50])] + np.random.uniform(-0.02, 0.02, 3)
+
+    start = time.perf_counter()
+    brute = all_pairs(s, r)
+    t_brute = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hashed = candidate_pairs(s, r)
+    t_hash = time.perf_counter() - start
+
+    same = set(map(tuple, brute)) == set(map(tuple, hashed))
+    print(
+        f"{n:6d} bodies, {len(hashed):4d} pairs, same: {same}, "
+        f"all pairs {t_brute * 1000:8.2f} ms, spatial hash {t_hash * 1000:6.2f} ms"
+    )
@@ -1,16 +1,70 @@
 import argparse
 
-import force_awakens.app as app
-import force_awakens.web.server as web
+from force_awakens.mechanics.autotune import Autotuner
+from force_awakens.mechanics.backends import NAMES, conformance, select
+from force_awakens.mechanics.engine import SOLVERS
+from force_awakens.mechanics.integrators import INTEGRATORS
+from force_awakens.mechanics.parallel import ParallelSolver
 
 from multiprocessing import Process, Queue
 
 
+def _physics(suppress=False):
+    # physics arguments, shared by the app and the headless simulation,
+    # with suppress the options only override the ones given before
+    # the subcommand, their defaults are the parent parser's
+    physics = argparse.ArgumentParser(add_help=False)
+
+    def add(*names, default=None, **kwargs):
+        if suppress:
+            default = argparse.SUPPRESS
+        physics.add_argument(*names, default=default, **kwargs)
+
+    # gravity solver, opening angle of the tree code,
+    # and mesh points per axis of the particle-mesh code
+    add("-s", "--solver", default="direct", choices=SOLVERS)
+    add("--theta", type=float, default=0.5)
+    add("--grid", type=int, default=64)
+
+    # number of processes computing forces, 1 computes them in the app,
+    # most processes tried by the auto solver (all cores by default)
+    add("-j", "--workers", type=int, default=None)
+
+    # time integration scheme
+    add("-i", "--integrator", default="leapfrog", choices=INTEGRATORS)
+
+    # bodies perturbed by the others by less than this fraction of the
+    # black hole attraction follow keplerian orbits, 0 disables it
+    add("--kepler", type=float, default=0.0)
+
+    # compute backend of the kernels, auto uses the jit one when
+    # numba is installed, and the numpy reference otherwise
+    add("-b", "--backend", default="auto", choices=NAMES)
+
+    # number of stars orbiting the black hole moved by the gravity
+    # of the bodies, 0 rotates them around it instead
+    add("--tracers", type=int, default=0)
+
+    # file every step is recorded to
+    add("--record", default=None)
+
+    # file the state is saved to periodically and on exit,
+    # and file of a saved state to continue from
+    add("--checkpoint", default=None)
+    add("--restore", default=None)
+
+    # conserved quantities are sampled every few steps, 0 disables them
+    add("--diagnostics", type=int, default=60)
+
+    return physics
+
+
 def main():
     # command line arguments
     parser = argparse.ArgumentParser(
         prog="The Force Awakens",
         description="2024 McGill Physics Hackathon, Dawson College",
+        parents=[_physics()],
     )
 
     # enable or disable web client connection capability
@@ -25,9 +79,83 @@ def main():
 
     # optionally disable ngrok tunnel
     parser.add_argument("-n", "--no-tunnel", action="store_true")
+
+    # play a recorded file instead of simulating
+    parser.add_argument("--replay", default=None)
+
+    # headless simulation, without window or webserver,
+    # reports the throughput of the engine
+    commands = parser.add_subparsers(dest="command")
+    headless = commands.add_parser("simulate", parents=[_physics(suppress=True)])
+    headless.add_argument("-n", "--bodies", type=int, default=1024)
+    headless.add_argument("--steps", type=int, default=600)
+    headless.add_argument("--dt", type=float, default=1 / 120)
+    headless.add_argument("--seed", type=int, default=None)
+
+    # number of independent systems of n bodies run together, batched
+    headless.add_argument("-e", "--ensemble", type=int, default=0)
+
+    # compare every available backend against the numpy reference
+    headless.add_argument("--conformance", action="store_true")
     args = parser.parse_args()
 
+    solver = SOLVERS[args.solver]()
+    if hasattr(solver, "theta"):
+        solver.theta = args.theta
+    if hasattr(solver, "grid"):
+        solver.grid = args.grid
+    if isinstance(solver, Autotuner):
+        # tries every available backend, and pools of up to -j workers
+        solver.backend = args.backend
+        if args.workers:
+            solver.max_workers = args.workers
+    else:
+        if hasattr(solver, "backend"):
+            solver.backend = select(args.backend)
+        if args.workers and args.workers > 1 and getattr(solver, "shardable", True):
+            solver = ParallelSolver(solver, args.workers)
+
+    if args.command == "simulate":
+        # no OpenGL, imgui, or Flask imports
+        import force_awakens.simulate as simulate
+
+        if args.conformance:
+            for name, error in conformance().items():
+                print(f"{name}: max relative error {error:.3e}")
+            return
+
+        if args.ensemble:
+            simulate.run_ensemble(
+                n_scenario=args.ensemble,
+                n_body=args.bodies,
+                steps=args.steps,
+                dt=args.dt,
+                seed=args.seed,
+            )
+            return
+
+        simulate.run(
+            n_body=args.bodies,
+            steps=args.steps,
+            dt=args.dt,
+            seed=args.seed,
+            solver=solver,
+            integrator=args.integrator,
+            backend=args.backend,
+            kepler=args.kepler,
+            tracers=args.tracers,
+            record=args.record,
+            checkpoint=args.checkpoint,
+            restore=args.restore,
+            diagnostics=args.diagnostics,
+        )
+        return
+
+    import force_awakens.app as app
+
     if args.web:
+        import force_awakens.web.server as web
+
         # if web clients is enabled,
         # share a multiprocessing queue between
         # webserver and renderer, to sync acceleration
@@ -71,10 +199,32 @@ def main():
             args.web,
             qr=img,
             vec_queue=vec_queue,
+            solver=solver,
+            integrator=args.integrator,
+            backend=args.backend,
+            kepler=args.kepler,
+            tracers=args.tracers,
+            record=args.record,
+            replay=args.replay,
+            checkpoint=args.checkpoint,
+            restore=args.restore,
+            diagnostics=args.diagnostics,
         )
     else:
         # run the app without web capabilities
-        app.run(args.web)
+        app.run(
+            args.web,
+            solver=solver,
+            integrator=args.integrator,
+            backend=args.backend,
+            kepler=args.kepler,
+            tracers=args.tracers,
+            record=args.record,
+            replay=args.replay,
+            checkpoint=args.checkpoint,
+            restore=args.restore,
+            diagnostics=args.diagnostics,
+        )
 
 
 if __name__ == "__main__":
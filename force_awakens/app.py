@@ -14,18 +14,38 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 
 import force_awakens.mechanics
-from force_awakens.graphics.draw import Background, BlackHole, Planet
+from force_awakens.graphics.draw import (
+    Axes,
+    Background,
+    BlackHole,
+    Clouds,
+    Planets,
+    Preview,
+    Spheres,
+    Trails,
+)
 from force_awakens.graphics.render import load_texture_simple
-from force_awakens.mechanics.mechanics import add_body
+from force_awakens.mechanics.checkpoint import (
+    Checkpointer,
+    capture,
+    load,
+    render_state,
+    restore_engine,
+    restore_render,
+    save,
+)
+from force_awakens.mechanics.diagnostics import Diagnostics
+from force_awakens.mechanics.engine import Engine
+from force_awakens.mechanics.physics_thread import PhysicsThread
+from force_awakens.mechanics.predictor import Predictor
+from force_awakens.mechanics.recording import Recorder, Recording, Replay
+from force_awakens.mechanics.tracers import Tracers
+from force_awakens.mechanics.mechanics import add_body, launch
 from force_awakens.mechanics.colors import COLORS
 
 # Drawing transformation array to transform OpenGL coordinates to right-handed physics coordinate system
 T = np.array([[1, 0, 0], [0, 0, -1], [0, 1, 0]])
 
-# Sets the axes for the simulation
-_axes_y = np.mgrid[0:2, 0:1:11j, 0:1].T.reshape((-1, 3)) - [0.5, 0.5, 0.0]
-_axes_x = _axes_y[:, [1, 0, 2]]
-
 
 # main class for the simulation and usage of it
 class App:
@@ -36,6 +56,16 @@ class App:
         web,
         qr=None,
         vec_queue=None,
+        solver="direct",
+        integrator="leapfrog",
+        backend="auto",
+        kepler=0.0,
+        tracers=0,
+        record=None,
+        replay=None,
+        checkpoint=None,
+        restore=None,
+        diagnostics=60,
         zoom_sensitivity=0.1,
         pan_sensitvity=0.001,
         orbit_sensitivity=0.1,
@@ -60,6 +90,9 @@ class App:
 
         self.view_left, self.view_right = 0, 0
 
+        # Axis grid, created when first drawn
+        self.axes = None
+
         # Creates window and buttons
         self.window = self.window_init(window_size, name)
         self.imgui_impl = self.init_imgui(self.window)
@@ -77,7 +110,20 @@ class App:
         self._load_planets()
 
         # Start rendering
-        self.rendering_loop(self.window, self.imgui_impl)
+        self.rendering_loop(
+            self.window,
+            self.imgui_impl,
+            solver=solver,
+            integrator=integrator,
+            backend=backend,
+            kepler=kepler,
+            tracers=tracers,
+            record=record,
+            replay=replay,
+            checkpoint=checkpoint,
+            restore=restore,
+            diagnostics=diagnostics,
+        )
 
     def _load_qr(self, qr):
         img_data = qr.convert("RGBA").tobytes()
@@ -221,34 +267,10 @@ class App:
         self.view_right = aspect_ratio
 
     def draw_axes(self):
-        glLineWidth(1.0)
-        glBegin(GL_LINES)
-
-        # Makes all the points in the x-axis and y-axis
-        glColor3f(1.0, 1.0, 1.0)
-        for point in _axes_x:
-            glVertex3f(*(point) @ T)
-        for point in _axes_y:
-            glVertex3f(*point @ T)
-        glEnd()
-
         # Draws the x/y/z axis grid
-        glLineWidth(2.0)
-        glBegin(GL_LINES)
-
-        glColor3f(1.0, 0.0, 0.0)
-        glVertex3f(*[-0.5, 0.0, 0.0] @ T)
-        glVertex3f(*[0.5, 0.0, 0.0] @ T)
-
-        glColor3f(0.0, 1.0, 0.0)
-        glVertex3f(*[0.0, -0.5, 0.0] @ T)
-        glVertex3f(*[0.0, 0.5, 0.0] @ T)
-
-        glColor3f(0.0, 0.0, 1.0)
-        glVertex3f(*[0.0, 0.0, -0.5] @ T)
-        glVertex3f(*[0.0, 0.0, 0.5] @ T)
-
-        glEnd()
+        if self.axes is None:
+            self.axes = Axes()
+        self.axes.draw()
 
     def window_should_close(self, window):
         # Returns if the window should close
@@ -301,38 +323,85 @@ class App:
         self,
         window,
         imgui_impl,
-        n_body=64,
+        n_body=16,
         G=6.6743e-2,
-        wanted=16,
         black_hole_r=1,
+        solver="direct",
+        integrator="leapfrog",
+        backend="auto",
+        kepler=0.0,
+        tracers=0,
+        record=None,
+        replay=None,
+        checkpoint=None,
+        restore=None,
+        diagnostics=60,
     ):
-        # Initialises the masses, accelerations, velocities, and positions of n_body planets
-        m = np.random.randint(10, 30, n_body)
-        a = np.zeros((n_body, 3), dtype=np.float32)
-        a_sum = np.zeros((n_body, 3), dtype=np.float32)
-        v = np.random.randint(-1, 1, (n_body, 3)).astype(float)
-        s = np.random.randint(-10, 10, (n_body, 3)).astype(float)
-
-        # Initialises the lack of decay of any initial body
-        decaying = np.zeros(n_body, dtype=bool)
-        decay = np.ones(n_body, dtype=np.float32)
-
-        # Sets the mass, velocity, and position of the central black hole
-        m[0] = 800
-        v[0] = 0
-        s[0] = 0
-
-        # Creates the size of all planets and black holes
-        render_calls = [BlackHole(black_hole_r)]
-        for i, r in enumerate(m):
-            if i == 0:
-                continue
-            render_calls.append(Planet(r * 0.01))
+        checkpointer = None
+
+        # Keeps the trails of every body in one buffer, by body id
+        trails = Trails()
+        if replay:
+            # Plays a recording instead of simulating, with a
+            # render call for every body id of the recording
+            physics = Replay(Recording(replay))
+            black_hole = BlackHole(black_hole_r)
+            planets = Planets(physics.recording.n_ids)
+        else:
+            # Creates the physics engine, which owns the masses, accelerations,
+            # velocities, and positions of n_body planets
+            engine = Engine(
+                n_body=n_body,
+                G=G,
+                black_hole_r=black_hole_r,
+                solver=solver,
+                integrator=integrator,
+                backend=backend,
+                kepler=kepler,
+            )
+
+            # Optionally, continues from a checkpoint, with as many tracers
+            if restore:
+                state = load(restore)
+                if "tracer_s" in state:
+                    tracers = len(state["tracer_s"])
+
+            # Optionally, the stars orbiting the black hole are massless
+            # tracers moved by the gravity of the bodies
+            if tracers:
+                tracers = Tracers(engine, tracers)
+            else:
+                tracers = None
+            if restore:
+                restore_engine(engine, state, tracers)
+
+            # Steps the engine by fixed steps on its own thread,
+            # independently of the frame rate
+            physics = PhysicsThread(engine, tracers)
+
+            # Creates the black hole, and the planets of every
+            # other body, indexed by the id of their body
+            if tracers is not None:
+                black_hole = BlackHole(black_hole_r, n_stars=tracers.n)
+            else:
+                black_hole = BlackHole(black_hole_r)
+            planets = Planets(engine.next_id)
+            if restore:
+                restore_render(planets, state, trails)
 
-        # Creates the mask to hide all non-desired planets
-        mask = np.zeros(n_body, dtype=bool)
-        for i in range(wanted):
-            mask[i] = True
+            # Optionally, the state is saved periodically, to restore it
+            # after a restart
+            if checkpoint:
+                checkpointer = Checkpointer(checkpoint)
+
+            # Optionally, every step is recorded to be replayed later
+            if record:
+                engine.recorder = Recorder(record)
+
+            # Optionally, the conserved quantities are sampled every
+            # few steps, to show how far the integration drifts
+            if diagnostics:
+                engine.diagnostics = Diagnostics(diagnostics)
 
         # enable depth and occlusion
         glEnable(GL_DEPTH_TEST)
@@ -348,12 +417,29 @@ class App:
         # Generates the stars in the background of the window
         background = Background()
 
+        # Draws the spheres of every planet at once, and the
+        # clouds of points of the planets being introduced
+        spheres = Spheres()
+        clouds = Clouds()
+
+        # Predicts the path of the next launched body in the background,
+        # from a sideways offset drawn ahead of the launch
+        predictor = Predictor(G)
+        preview = Preview()
+        offset = np.random.uniform(-5, 5)
+
+        # bodies launched, with their color, until the
+        # physics thread placed them
+        launches = []
+
         # Starts
         start = time.time()
         dt = 0
 
         draw_background, draw_dense = True, True
 
+        physics.start()
+        predictor.start()
         while not self.window_should_close(window):
             # Updates the introdution
             if self.intro:
@@ -364,77 +450,27 @@ class App:
             # Updates the window, background, and axes
             self.update()
 
-            # Sets the acceleration that will be added to so that all
-            # accelerations, velocities, and positions can be updated simultaneously
-            a_sum[:] = a
-
-            for body in range(n_body):
-                for j in range(n_body):
-                    # skip current body,
-                    # and bodies that are masked
-                    if j == body:
-                        continue
-                    if not mask[j]:
-                        continue
-
-                    # For every body is being shown, will do the following for every other body:
-
-                    s_a, s_b = s[body], s[j]
-
-                    # Determines the distance between the mass that is being analyzed and each other body
-                    ds = s_b - s_a
-                    d = np.linalg.norm(ds)
-
-                    # If the distance between the two masses is too small,
-                    # will mask the second mass
-                    # and add it's properties to the original mass
-                    if d < 0.05:
-                        m[body] = m[body] + m[j]
-                        a[body] += a[j]
-                        v[body] += v[j]
-
-                        mask[j] = False
-                    else:
-                        m_a = m[body]
-                        F_a = np.zeros(3, dtype=np.float32)
-
-                        # Calculates the force of gravity
-                        # on the body for every other body,
-                        # and adds it to the total for that body
-                        m_b = m[j]
-                        Fg = G * m_a * m_b / d**2
-
-                        F_a += ds / d * Fg
-                        a_sum[body] += F_a
-
-                    # If the body is too close to the black hole,
-                    # commences it's decay animation
-                    if body != 0 and np.linalg.norm(s_a) < black_hole_r:
-                        decaying[body] = True
-
-                # Continually decays the trails of all bodies that
-                # have entered the black hole until they disappear
-                if decaying[body]:
-                    decay[body] *= 0.95
-                    v[body] = 0
-                    if decay[body] < 0.05:
-                        decaying[body] = False
-                        decay[body] = 1.0
-                        mask[body] = False
-
-            # If the body is not masked and is not decaying,
-            # then new accelerations,
-            # velocities, and positions are calculated for it
-            m_phys = mask & (~decaying)
-            a[m_phys] = a_sum[m_phys] / m[m_phys, np.newaxis]
-            v[m_phys] = a[m_phys] * dt + v[m_phys]
-            s[m_phys] = v[m_phys] * dt + s[m_phys]
-
-            # Resets the position and velocity of the black hole to zero,
-            # to ensure it doesn't move, and sets the it's mask to True so that
-            v[0] = 0
-            s[0] = 0
-            mask[0] = True
+            # Latest state published by the physics thread,
+            # and positions interpolated up to now
+            snapshot, s = physics.positions()
+
+            # bodies launched on earlier frames the physics thread placed,
+            # a body is placed before any snapshot holding it is published
+            waiting = []
+            for future, color in launches:
+                if not future.done():
+                    waiting.append((future, color))
+                    continue
+                draw_i = future.result()
+                planets.start_intro(draw_i)
+
+                # Render the planet and sizes
+                # aka draw new planet
+                planets.set_color(draw_i, color)
+
+                # the id may have had a body before, its trail restarts
+                trails.reset(draw_i)
+            launches[:] = waiting
 
             # Creates a new frame
             imgui.new_frame()
@@ -449,36 +485,102 @@ class App:
             # make appropriate render calls for stars
             if draw_background:
                 background.draw()
-            render_calls[0].draw_dense = draw_dense
-
-            # Renders every body that is not masked
-            for body in range(n_body):
-                if not mask[body]:
-                    continue
-                render_calls[body].draw(s[body], start, decay[body])
-
-            # Shows the fps and number of bodies currently unmasked
+            black_hole.draw_dense = draw_dense
+            black_hole.tracers = snapshot.tracers
+            black_hole.draw(start)
+
+            # Renders every other active body, their spheres in one draw call,
+            # their intro clouds in another, and their trails in a third
+            planets.draw(snapshot.ids, s, snapshot.r, snapshot.decay, spheres, clouds)
+            spheres.draw()
+            clouds.draw()
+            trails.draw(snapshot.ids, s, planets.trail_color[snapshot.ids])
+
+            # requests a checkpoint when one is due, written in the background
+            if checkpointer is not None:
+                checkpointer.update(physics, lambda: render_state(planets, trails))
+
+            # Shows the fps and number of bodies currently active
             if dt:
                 imgui.text(f"{1/dt:.2f} fps")
-            imgui.text(f"{np.sum(mask)} bodies")
+            imgui.text(f"{len(snapshot.ids)} bodies")
+            if replay:
+                # seek any frame of the recording, and its playback speed
+                recording = physics.recording
+                changed, frame = imgui.slider_int(
+                    "Frame", physics.frame, 0, len(recording) - 1
+                )
+                if changed:
+                    physics.seek(frame)
+                _, physics.speed = imgui.slider_float(
+                    "Replay speed", physics.speed, 0.0, 4.0
+                )
+            else:
+                clock = physics.clock
+                imgui.text(f"{clock.substeps} steps of {clock.h * 1000:.1f} ms")
+                imgui.text(f"{physics.evaluations} force evaluations")
+                imgui.text(f"{engine.backend.name} backend")
+                if engine.kepler:
+                    imgui.text(f"{engine.n_kepler} bodies on keplerian orbits")
+
+                # drift of the conserved quantities since the start
+                if engine.diagnostics is not None:
+                    energy, momentum, angular = engine.diagnostics.drift()
+                    imgui.text(f"energy drift {energy:.2e}")
+                    imgui.text(f"momentum drift {momentum:.2e}")
+                    imgui.text(f"angular momentum drift {angular:.2e}")
+
+                # simulated seconds per real second
+                _, clock.warp = imgui.slider_float("Time warp", clock.warp, 0.0, 4.0)
+
+                # choice of the autotuner, and the measured cost of a
+                # force pass of every candidate, around the solver in use
+                solver = engine.solver
+                if hasattr(solver, "costs"):
+                    imgui.text(f"Autotuned: {solver.choice}")
+                    for name, cost in sorted(solver.costs.items(), key=lambda c: c[1]):
+                        imgui.text(f"  {name}: {cost * 1000:.2f} ms")
+                    solver = solver.current
+
+                # worker pool of the multi-core backend, around the solver
+                if hasattr(solver, "workers"):
+                    imgui.text(
+                        f"{solver.workers} workers, {solver.speedup:.1f}x speedup, "
+                        f"{solver.efficiency:.0%} efficiency"
+                    )
+                    solver = solver.solver
+
+                # accuracy vs speed of the tree code
+                if hasattr(solver, "theta"):
+                    _, solver.theta = imgui.slider_float(
+                        "Opening angle", solver.theta, 0.0, 1.5
+                    )
+
+                # mesh resolution and cost of each phase of the mesh solver
+                if hasattr(solver, "timings"):
+                    imgui.text(f"{solver.grid}^3 mesh, cell {solver.h:.3g}")
+                    for phase, duration in solver.timings.items():
+                        imgui.text(f"  {phase}: {duration * 1000:.2f} ms")
 
             def draw_new(color, r):
-                draw_i = add_body(
-                    render_calls,
-                    mask,
-                    s,
-                    v,
+                nonlocal offset
+
+                # a recording can not be changed
+                if replay:
+                    return
+
+                # the body is placed by the physics thread, its render call
+                # is set up once its id is known, on a later frame
+                future = add_body(
+                    physics,
                     self.zoom_level,
                     (self.pan_x, self.pan_y),
+                    r,
+                    r * 0.01,
+                    offset,
                 )
-                # Render the planet and sizes
-                # aka draw new planet, and renable mask
-                render_obj = render_calls[draw_i]
-                render_obj.set_color(color)
-                render_obj.r = r * 0.01
-                m[draw_i] = r
-                decaying[draw_i] = False
-                decay[draw_i] = 1.0
+                launches.append((future, color))
+                offset = np.random.uniform(-5, 5)
 
             imgui.spacing()
             imgui.spacing()
@@ -496,6 +598,7 @@ class App:
                 imgui.table_headers_row()
 
                 selection = np.zeros(len(self.items), dtype=bool)
+                hovered = False
                 # iterate trough each characteristics of the planets
                 # and display them on the screen (images for this section)
                 for i, item in enumerate(self.items):
@@ -509,6 +612,7 @@ class App:
                     # itterate trough each characteristics of the planets
                     # and display them on the screen (mass, name and type for this section)
                     selection[i] = imgui.button(f"Select {name}")
+                    hovered |= imgui.is_item_hovered()
                     imgui.text(name)
                     imgui.text(f"  Mass: {mass:.4g} kg")
                     imgui.text(f"  Type: {body_type}")
@@ -524,6 +628,16 @@ class App:
 
                 # put an end to the table
                 imgui.end_table()
+
+                # ghost trail of the body about to be selected or thrown,
+                # against the bodies as they are now
+                if not replay and (hovered or self.web):
+                    s_launch, v_launch = launch((self.pan_x, self.pan_y), offset)
+                    path = predictor.path(
+                        s_launch, v_launch, snapshot, r_stop=black_hole_r
+                    )
+                    if path is not None:
+                        preview.draw(path)
             # render the image and complete its "loop"
             imgui.end()
 
@@ -556,12 +670,73 @@ class App:
             dt = current - start
             start = current
 
+        physics.stop()
+        predictor.stop()
+        if record and not replay:
+            engine.recorder.close()
+
+        # worker pools of the solver, the physics thread is stopped
+        if not replay and hasattr(engine.solver, "close"):
+            engine.solver.close()
+
+        # last checkpoint, the physics thread is stopped
+        if checkpointer is not None:
+            checkpointer.close()
+            save(
+                checkpoint,
+                {**capture(engine, tracers), **render_state(planets, trails)},
+            )
         self.terminate()
 
 
 # run the app
-def run(web, qr=None, vec_queue=None):
+def run(
+    web,
+    qr=None,
+    vec_queue=None,
+    solver="direct",
+    integrator="leapfrog",
+    backend="auto",
+    kepler=0.0,
+    tracers=0,
+    record=None,
+    replay=None,
+    checkpoint=None,
+    restore=None,
+    diagnostics=60,
+):
     if web:
-        App((1920, 1080), "The Force Awakens", web, qr=qr, vec_queue=vec_queue)
+        App(
+            (1920, 1080),
+            "The Force Awakens",
+            web,
+            qr=qr,
+            vec_queue=vec_queue,
+            solver=solver,
+            integrator=integrator,
+            backend=backend,
+            kepler=kepler,
+            tracers=tracers,
+            record=record,
+            replay=replay,
+            checkpoint=checkpoint,
+            restore=restore,
+            diagnostics=diagnostics,
+        )
     else:
-        App((1920, 1080), "The Force Awakens", web, qr=qr)
+        App(
+            (1920, 1080),
+            "The Force Awakens",
+            web,
+            qr=qr,
+            solver=solver,
+            integrator=integrator,
+            backend=backend,
+            kepler=kepler,
+            tracers=tracers,
+            record=record,
+            replay=replay,
+            checkpoint=checkpoint,
+            restore=restore,
+            diagnostics=diagnostics,
+        )
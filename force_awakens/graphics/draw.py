@@ -5,7 +5,12 @@ from OpenGL.GL import *
 from OpenGL.GLU import *
 
 from force_awakens.mechanics.colors import COLORS
-from force_awakens.graphics.render import create_vbo, update_vbo, draw_vbo
+from force_awakens.graphics.render import (
+    Program,
+    VertexArray,
+    create_vbo,
+    update_vbo,
+)
 
 
 # The transformation matrix to transform the camera coordinates into the right-handed coordinates
@@ -125,101 +130,434 @@ def rotation_matrix(rx, ry, rz):
     return z_t @ y_t @ x_t
 
 
-class Planet:
-    def __init__(self, r, res=15, s_cache=512):
-        self.prev_n = 0
-        self.s_cache = s_cache
+# vertices with a color of their own
+_COLOR_VERTEX = """
+#version 120
+attribute vec3 vertex;
+attribute vec4 color;
+varying vec4 v_color;
+
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(vertex, 1.0);
+    v_color = color;
+}
+"""
+
+_COLOR_FRAGMENT = """
+#version 120
+varying vec4 v_color;
+
+void main() {
+    gl_FragColor = v_color;
+}
+"""
+
+
+class Axes:
+    def __init__(self):
+        # grid of the x-axis and y-axis in white, and the x/y/z axes
+        # in red, green and blue
+        grid_y = np.mgrid[0:2, 0:1:11j, 0:1].T.reshape((-1, 3)) - [0.5, 0.5, 0.0]
+        grid_x = grid_y[:, [1, 0, 2]]
+        axes = np.repeat(np.eye(3), 2, axis=0) * np.tile([[-0.5], [0.5]], (3, 1))
+
+        point = np.concatenate([grid_x, grid_y, axes])
+        self.data = np.ones((len(point), 6), dtype=np.float32)
+        self.data[:, :3] = point @ T
+        self.data[-6:, 3:] = np.repeat(np.eye(3), 2, axis=0)
+        self.grid_n = len(point) - 6
+
+        self.program = Program(_COLOR_VERTEX, _COLOR_FRAGMENT, ("vertex", "color"))
+        self.vbo = create_vbo(self.data)
+        self.vao = VertexArray()
+        self.vao.attributes(self.vbo, (3, 3))
 
-        self.r = r
-
-        self.intro = False
-
-        # Sets the initial color to rgb 1,1,1
-        self.def_color = np.ones(4, dtype=np.float32)
-
-        # buffer sphere VBO with sphere vertices, and
-        # default white color (transformed later by planet color)
-        self.sphere_point = generate_sphere_vertices(1, res, res).reshape((-1, 3))
-        self.sphere_color = np.ones((len(self.sphere_point), 4), dtype=np.float32)
-        self.sphere_vbo = create_vbo(self._get_s_vbo_data(r, [0, 0, 0], self.def_color))
-        self.sphere_stride = self.sphere_point.itemsize * 7
-        self.sphere_n = self.sphere_point.shape[0]
-
-        # buffer trail VBO with trail vertices, and
-        # default white color
-        self.trail_point = np.zeros((s_cache, 3), dtype=np.float32)
-        self.trail_color = np.ones((s_cache, 3), dtype=np.float32)
-        self.trail_vbo = create_vbo(self._get_t_vbo_data(self.def_color[:3]))
-        self.trail_stride = self.trail_point.itemsize * 6
-
-    def _get_s_vbo_data(self, r, s, col):
-        # get sphere VBO data
-        # by changing radius, and setting position
-        points = (self.sphere_point * r + s) @ T
-        colors = self.sphere_color * col
-        return np.hstack((points, colors)).astype(np.float32)
-
-    def _get_t_vbo_data(self, col):
-        # get trails VBO data
-        points = self.trail_point @ T
-        colors = self.trail_color * col
-        return np.hstack((points, colors)).astype(np.float32)
-
-    def _draw_sphere(self, scalar, r, s, alpha):
-        # Draws a sphere using triangles to build it
-
-        col = self.def_color * [1, scalar, 1, 1]
-        update_vbo(self.sphere_vbo, self._get_s_vbo_data(r, s, col))
-        draw_vbo(
-            self.sphere_vbo, self.sphere_stride, GL_TRIANGLES, self.sphere_n, c_ptr=4
+    def draw(self):
+        with self.program.use():
+            glLineWidth(1.0)
+            self.vao.draw(GL_LINES, self.grid_n)
+            glLineWidth(2.0)
+            self.vao.draw(GL_LINES, 6, self.grid_n)
+
+
+# the unit sphere of every planet, scaled, moved, and colored per instance
+_SPHERE_VERTEX = """
+#version 120
+attribute vec3 vertex;
+attribute vec4 instance;
+attribute vec4 color;
+varying vec4 v_color;
+
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix
+        * vec4(instance.xyz + vertex * instance.w, 1.0);
+    v_color = color;
+}
+"""
+
+
+class Instances:
+    def __init__(self, mesh, shader, mode, capacity=16):
+        # one mesh drawn at every queued instance by the vertex shader,
+        # with mode, already transformed
+        self.mesh_vbo = create_vbo(mesh)
+        self.mesh_n = len(mesh)
+        self.mode = mode
+
+        self.program = Program(shader, _COLOR_FRAGMENT, ("vertex", "instance", "color"))
+
+        # instances of the frame: position and size, and color,
+        # uploaded once per frame, grown as they are added
+        self.s = np.zeros((capacity, 3))
+        self.data = np.zeros((capacity, 8), dtype=np.float32)
+        self.vbo = create_vbo(self.data)
+        self.n = 0
+
+        # per vertex mesh, per instance position, size and color
+        self.vao = VertexArray()
+        self.vao.attribute(0, self.mesh_vbo, 3)
+        self.vao.attributes(self.vbo, (4, 4), location=1, divisor=1)
+
+    def add(self, s, size, color):
+        # queue instances of the given sizes at s, drawn with the others
+        end = self.n + len(s)
+        if end > len(self.data):
+            capacity = len(self.data)
+            while capacity < end:
+                capacity *= 2
+            for name in ("s", "data"):
+                array = getattr(self, name)
+                grown = np.zeros((capacity, array.shape[1]), dtype=array.dtype)
+                grown[: self.n] = array[: self.n]
+                setattr(self, name, grown)
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = create_vbo(self.data)
+            self.vao.attributes(self.vbo, (4, 4), location=1, divisor=1)
+
+        self.s[self.n : end] = s
+        self.data[self.n : end, 3] = size
+        self.data[self.n : end, 4:] = color
+        self.n = end
+
+    def draw(self, **uniforms):
+        # every queued instance in one instanced call
+        n, self.n = self.n, 0
+        if n == 0:
+            return
+        self.data[:n, :3] = self.s[:n] @ T
+        update_vbo(self.vbo, self.data[:n])
+
+        with self.program.use(**uniforms):
+            self.vao.draw(self.mode, self.mesh_n, instances=n)
+
+
+class Spheres(Instances):
+    def __init__(self, res=15, capacity=64):
+        # one unit sphere mesh shared by every planet, the size is the radius
+        mesh = generate_sphere_vertices(1, res, res).reshape((-1, 3)) @ T
+        super().__init__(
+            mesh.astype(np.float32), _SPHERE_VERTEX, GL_TRIANGLES, capacity
         )
 
-    def _draw_trail(self, s, scalar):
-        # push new position down the queue, so that the
-        # last position is deleted, all items are shifted back
-        # by one, and the new item is placed first
-        self.trail_point[1:] = self.trail_point[:-1]
-        self.trail_point[0] = s
-        self.prev_n = min(self.s_cache - 1, self.prev_n + 1)
-
-        # update VBO with new positions, and draw
-        col = self.def_color[:3] * [0.5, 0.5 * scalar, 0.5]
-        update_vbo(self.trail_vbo, self._get_t_vbo_data(col))
-        glLineWidth(2.0)
 
-        # only draw vertices where trail is defined and initialized
-        draw_vbo(self.trail_vbo, self.trail_stride, GL_LINE_STRIP, self.prev_n)
+# cloud of points around every newly added planet, a new random offset
+# tan(u), u in [-1, 1], for every point every frame, hashed from its seed,
+# its planet and the frame
+_CLOUD_VERTEX = """
+#version 120
+attribute vec3 vertex;
+attribute vec4 instance;
+attribute vec4 color;
+uniform float frame;
+varying vec4 v_color;
+
+float random(vec3 p) {
+    return fract(sin(dot(p, vec3(12.9898, 78.233, 37.719))) * 43758.5453);
+}
+
+void main() {
+    vec3 p = vertex + instance.xyz + frame;
+    vec3 u = vec3(random(p), random(p.yzx), random(p.zxy));
+    gl_Position = gl_ModelViewProjectionMatrix
+        * vec4(instance.xyz + tan(2.0 * u - 1.0), 1.0);
+    gl_PointSize = instance.w;
+    v_color = color;
+}
+"""
+
+
+class Clouds(Instances):
+    def __init__(self, n_points=100, capacity=16):
+        # seeds of the points of a cloud, shared by every cloud,
+        # the size is the one of the points
+        seed = np.random.random((n_points, 3)).astype(np.float32)
+        super().__init__(seed, _CLOUD_VERTEX, GL_POINTS, capacity)
+
+        # frames drawn, the points move every frame
+        self.frame = 0
 
-    def set_color(self, col):
+    def draw(self):
+        self.frame = (self.frame + 1) % 1024
+        glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+        super().draw(frame=float(self.frame))
+        glDisable(GL_VERTEX_PROGRAM_POINT_SIZE)
+
+
+# trails of every body, the vertices of a frame in the buffer are in the
+# order of the body ids, the color of a vertex is the one of its id
+_TRAIL_VERTEX = """
+#version 130
+in vec3 vertex;
+uniform int capacity;
+uniform sampler1D colors;
+out vec4 v_color;
+
+void main() {
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(vertex, 1.0);
+    v_color = texelFetch(colors, gl_VertexID % capacity, 0);
+}
+"""
+
+_TRAIL_FRAGMENT = """
+#version 130
+in vec4 v_color;
+
+void main() {
+    gl_FragColor = v_color;
+}
+"""
+
+
+class Trails:
+    def __init__(self, length=2048, capacity=64):
+        # trails of every body id in one buffer, a row of capacity vertices
+        # per frame: ring buffers of length frames sharing head, the row
+        # of the newest vertices, already transformed
+        self.length = length
+        self.head = -1
+        self.point = np.zeros((length, capacity, 3), dtype=np.float32)
+
+        # vertices in the trail of every id, 0 for the ids without a body,
+        # and the color of every trail
+        self.count = np.zeros(capacity, dtype=int)
+        self.color = np.zeros((capacity, 4), dtype=np.float32)
+
+        self.program = Program(_TRAIL_VERTEX, _TRAIL_FRAGMENT, ("vertex",))
+        self.vao = VertexArray()
+        self._buffers()
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        self._colors()
+
+    def _buffers(self):
+        # the vertices, and the indices of the trail of every id in a row of
+        # length + 1, from the first frame of the ring to the last, and the
+        # first again, so that a strip continues across the wrap point
+        capacity = len(self.count)
+        self.vbo = create_vbo(self.point)
+        self.vao.attribute(0, self.vbo, 3)
+        frame = np.arange(self.length + 1) % self.length
+        self.vao.elements(frame * capacity + np.arange(capacity)[:, np.newaxis])
+
+    def _colors(self):
+        # colors of every id, the texture is resized with the trails
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexImage1D(
+            GL_TEXTURE_1D,
+            0,
+            GL_RGBA32F,
+            len(self.color),
+            0,
+            GL_RGBA,
+            GL_FLOAT,
+            self.color,
+        )
+        glBindTexture(GL_TEXTURE_1D, 0)
+
+    def reserve(self, n):
+        # double the capacity until n ids fit, copying the trails over
+        capacity = len(self.count)
+        while capacity < n:
+            capacity *= 2
+        if capacity == len(self.count):
+            return
+
+        point = np.zeros((self.length, capacity, 3), dtype=np.float32)
+        point[:, : len(self.count)] = self.point
+        self.point = point
+        for name in ("count", "color"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+            grown[: len(array)] = array
+            setattr(self, name, grown)
+
+        glDeleteBuffers(1, [self.vbo])
+        self._buffers()
+        self._colors()
+
+    def upload(self):
+        # whole buffer, when it is replaced (restored from a checkpoint)
+        update_vbo(self.vbo, self.point)
+
+    def reset(self, i):
+        # the trail of id i restarts, it was given to a new body
+        self.reserve(i + 1)
+        self.count[i] = 0
+
+    def _push(self, ids, point):
+        # the new vertices overwrite the oldest ones, in the row at head,
+        # uploaded from the first id to the last in one call
+        row = self.point[self.head]
+        row[ids] = point
+        lo, hi = ids.min(), ids.max() + 1
+        update_vbo(self.vbo, row[lo:hi], row.nbytes * self.head + row[0].nbytes * lo)
+
+    def draw(self, ids, s, colors):
+        # appends positions s to the trails of bodies ids, with their colors,
+        # and draws the trails of every id with a body in one call
+        if len(ids) == 0:
+            return
+        self.reserve(ids.max() + 1)
+        self.head = (self.head + 1) % self.length
+        self._push(ids, (s @ T).astype(np.float32))
+
+        # trails of ids without a body are empty
+        alive = np.zeros(len(self.count), dtype=bool)
+        alive[ids] = True
+        self.count[~alive] = 0
+        self.count[ids] = np.minimum(self.count[ids] + 1, self.length)
+
+        self.color[ids] = colors
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexSubImage1D(
+            GL_TEXTURE_1D, 0, 0, len(self.color), GL_RGBA, GL_FLOAT, self.color
+        )
+
+        # only draw vertices where trails are defined and initialized,
+        # from the oldest to the newest, in two strips once they wrapped,
+        # the strips of a trail follow each other, empty ones are dropped
+        live = np.flatnonzero(self.count > 1)
+        n, head = self.count[live], self.head
+        start = live * (self.length + 1)
+        wrapped = n > head + 1
+        oldest = np.where(wrapped, self.length - (n - head - 1), head - n + 1)
+        first = np.stack([start + oldest, start], axis=1).ravel()
+        count = np.stack(
+            [np.where(wrapped, self.length + 1 - oldest, n), wrapped * (head + 1)],
+            axis=1,
+        ).ravel()
+        first, count = first[count > 0], count[count > 0]
+        if len(first) == 0:
+            glBindTexture(GL_TEXTURE_1D, 0)
+            return
+
+        glLineWidth(2.0)
+        with self.program.use(capacity=len(self.count), colors=0):
+            self.vao.multi_draw(GL_LINE_STRIP, first, count)
+        glBindTexture(GL_TEXTURE_1D, 0)
+
+
+class Planets:
+    def __init__(self, n=1, intro_n=511, capacity=64):
+        # planets of the body ids below n, 0 is the black hole: frames of
+        # their intro so far, whether it runs (it lasts intro_n frames),
+        # and their color, rgb 1,1,1 until set
+        self.n = n
+        self.intro_n = intro_n
+        capacity = max(capacity, n)
+        self.frame = np.zeros(capacity, dtype=int)
+        self.intro = np.zeros(capacity, dtype=bool)
+        self.color = np.ones((capacity, 4), dtype=np.float32)
+
+        # color of the trail of every id this frame, drawn with every
+        # other trail, the black hole's is transparent
+        self.trail_color = np.zeros((capacity, 4), dtype=np.float32)
+
+    def reserve(self, n):
+        # ids below n, the arrays double until they fit
+        capacity = len(self.frame)
+        while capacity < n:
+            capacity *= 2
+        if capacity != len(self.frame):
+            for name, fill in (("frame", 0), ("intro", 0), ("color", 1)):
+                array = getattr(self, name)
+                grown = np.full((capacity, *array.shape[1:]), fill, dtype=array.dtype)
+                grown[: len(array)] = array
+                setattr(self, name, grown)
+            grown = np.zeros((capacity, 4), dtype=np.float32)
+            grown[: len(self.trail_color)] = self.trail_color
+            self.trail_color = grown
+        self.n = max(self.n, n)
+
+    def start_intro(self, i):
+        # ids of removed bodies are reused, new ids get a new planet
+        self.reserve(i + 1)
+        self.frame[i] = 0
+        self.intro[i] = True
+
+    def set_color(self, i, col):
         # change star color
-        self.def_color[:3] = col
-
-    def draw(self, s, _, decay):
-        # Draws the introductory sequence for any given newly added planet
-        if self.intro:
-            scalar = (self.prev_n / (self.s_cache - 1)) ** 3
-        else:
-            scalar = decay
-        if decay == 1:
-            self._draw_sphere(scalar, self.r * scalar, s, 1.0)
-
-        # Creates the cloud of points surrounding newly created planets
-        if self.prev_n < (self.s_cache - 1) and self.intro:
-            uniform_points = np.random.uniform(-1, 1, (100, 3))
-            uniform_points = np.tan(uniform_points)
-            glPointSize(2 * (1 - scalar))
-            glBegin(GL_POINTS)
-
-            col = self.def_color[:3] * [1, scalar, 1]
-            glColor4f(*col, decay * -2.5 * (scalar + 0.25) * (scalar - 1))
-            for point in uniform_points:
-                glVertex3f(*(point + s) @ T)
-            glEnd()
-        else:
-            self.intro = False
-
-        # draw trail that follows
-        self._draw_trail(s, scalar)
+        self.color[i, :3] = col
+
+    def draw(self, ids, s, r, decay, spheres, clouds):
+        # queues the planets of the bodies ids but the black hole, at s,
+        # with their radii and decay, their spheres and clouds are drawn
+        # with every other planet's
+        planet = ids != 0
+        ids, s, r, decay = ids[planet], s[planet], r[planet], decay[planet]
+        if len(ids) == 0:
+            return
+        self.reserve(ids.max() + 1)
+        frame, intro, color = self.frame[ids], self.intro[ids], self.color[ids]
+
+        # the introductory sequence of newly added planets grows them,
+        # their decay in the black hole shrinks them
+        scalar = np.where(
+            intro, (np.minimum(frame, self.intro_n) / self.intro_n) ** 3, decay
+        )
+        tint = np.ones((len(ids), 4))
+        tint[:, 1] = scalar
+
+        whole = decay == 1
+        spheres.add(s[whole], (r * scalar)[whole], (color * tint)[whole])
+
+        # the cloud of points surrounding newly created planets
+        cloud = intro & (frame < self.intro_n)
+        cloud_color = color * tint
+        cloud_color[:, 3] = decay * -2.5 * (scalar + 0.25) * (scalar - 1)
+        clouds.add(s[cloud], 2 * (1 - scalar[cloud]), cloud_color[cloud])
+        self.intro[ids[~cloud]] = False
+        self.frame[ids] = np.minimum(frame + 1, self.intro_n)
+
+        # one color for the whole trail that follows
+        self.trail_color[ids, :3] = color[:, :3] * tint[:, :3] * 0.5
+        self.trail_color[ids, 3] = 1
+
+
+# stars orbiting the black hole, rotated about the x axis by an angle growing
+# with time at the angular speed of every star, unless time is 0
+_STARS_VERTEX = """
+#version 120
+attribute vec3 vertex;
+attribute vec3 color;
+attribute float speed;
+uniform float time;
+varying vec4 v_color;
+
+void main() {
+    float angle = speed * time;
+    float c = cos(angle);
+    float s = sin(angle);
+    vec3 star = vec3(
+        vertex.x, c * vertex.y + s * vertex.z, c * vertex.z - s * vertex.y
+    );
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(star, 1.0);
+    v_color = vec4(color, 1.0);
+}
+"""
 
 
 class BlackHole:
@@ -237,8 +575,12 @@ class BlackHole:
 
         # bind sphere vbo, calculate rendering params
         self.sphere_vbo = create_vbo(sphere_vbo_data)
-        self.sphere_stride = sphere_point.itemsize * 6
         self.sphere_n = sphere_point.shape[0]
+        self.sphere_program = Program(
+            _COLOR_VERTEX, _COLOR_FRAGMENT, ("vertex", "color")
+        )
+        self.sphere_vao = VertexArray()
+        self.sphere_vao.attributes(self.sphere_vbo, (3, 3))
 
         # Creates the stars surrounding the black hole
         self.n_stars = n_stars
@@ -254,60 +596,86 @@ class BlackHole:
         colors = np.random.random((n_stars, 3))
         colors = colors + 0.5 * (1 - colors)
 
-        # create empty VBO buffer for drawing stars
-        self.data = np.empty((n_stars, 6), dtype=np.float32)
-        self.data[:, :3] = stars
-        self.data[:, 3:] = colors
-        self.stride = self.data.itemsize * 6
+        # Rotates the stars around the black hole at a speed dependant upon
+        # their proximity to it, in radians per second, 1 / (30 * dist^2)
+        # every frame at 60 frames per second
+        dist = np.linalg.norm(stars, axis=1)
+        speed = 2 / dist**2
 
-        # Rotates the stars around the black hole at a speed dependant upon their proximity to it
-        self.dist = np.linalg.norm(stars, axis=1)
-        self.rot_mat = self._build_rot()
+        # VBO of the stars, uploaded once: position, color, and angular speed,
+        # the shader rotates them
+        self.data = np.empty((n_stars, 7), dtype=np.float32)
+        self.data[:, :3] = stars
+        self.data[:, 3:6] = colors
+        self.data[:, 6] = speed
+        self.point_vbo = create_vbo(self.data)
 
-        self.point_vbo = create_vbo(self._get_vbo_data(0))
+        self.program = Program(
+            _STARS_VERTEX, _COLOR_FRAGMENT, ("vertex", "color", "speed")
+        )
+        self.vao = VertexArray()
+        self.vao.attributes(self.point_vbo, (3, 3, 1))
 
-    def _draw_center(self, *_):
-        # draw black sphere
-        draw_vbo(self.sphere_vbo, self.sphere_stride, GL_TRIANGLES, self.sphere_n)
+        # seconds are counted from the first frame, to keep their precision
+        self.start = None
 
-    def _build_rot(self):
-        # Creates the rotation matrix for the stars around the black hole
-        rx = 1 / self.dist**2 * (1 / 30)
+        # positions of the tracers moved by the physics thread, when set,
+        # the stars are drawn there instead of being rotated
+        self.tracers = None
 
-        # pregenerate different rotation matrices that
-        # makes points closer to the center rotate faster
-        rot_mat = np.zeros((self.n_stars, 3, 3), dtype=np.float32)
-        rot_mat[:, 0, 0] = 1
-        rot_mat[:, 1, 1] = np.cos(rx)
-        rot_mat[:, 1, 2] = np.sin(rx)
-        rot_mat[:, 2, 1] = -np.sin(rx)
-        rot_mat[:, 2, 2] = np.cos(rx)
+    def _draw_center(self):
+        # draw black sphere
+        with self.sphere_program.use():
+            self.sphere_vao.draw(GL_TRIANGLES, self.sphere_n)
 
-        return rot_mat
+    def _draw_stars(self, t):
+        # tracers are uploaded every frame, and not rotated
+        if self.tracers is not None:
+            self.data[:, :3] = self.tracers @ T
+            update_vbo(self.point_vbo, self.data)
+            t = 0.0
 
-    def _get_vbo_data(self, t):
-        # Gets information on the buffer of of the stars
-        # rebuild the stars VBO by applying the buffered
-        # rotation matrix on the points with respect to dt
-        stars = self.rot_mat @ self.data[:, :3, np.newaxis]
-        self.data[:, :3] = stars.squeeze(-1)
+        with self.program.use(time=float(t)):
+            self.vao.draw(GL_POINTS, self.n_stars)
 
-        return self.data
+    def draw(self, t):
+        if self.start is None:
+            self.start = t
 
-    def draw(self, s, t, _):
         # draw stars in background
         if self.draw_dense:
             glDepthMask(GL_FALSE)
             glPointSize(1.0)
-            draw_vbo(self.point_vbo, self.stride, GL_POINTS, self.n_stars)
+            self._draw_stars(t - self.start)
             glDepthMask(GL_TRUE)
 
-        # update stars
-        update_vbo(self.point_vbo, self._get_vbo_data(t))
-
         # draw black hole in foreground
         glClear(GL_DEPTH_BUFFER_BIT)
-        self._draw_center(self.r, s)
+        self._draw_center()
+
+
+class Preview:
+    def __init__(self, n_points=512):
+        # ghost trail of the predicted path of the next launched body,
+        # in dim grey
+        self.n_points = n_points
+        self.data = np.zeros((n_points, 6), dtype=np.float32)
+        self.data[:, 3:] = 0.4
+        self.vbo = create_vbo(self.data)
+
+        self.program = Program(_COLOR_VERTEX, _COLOR_FRAGMENT, ("vertex", "color"))
+        self.vao = VertexArray()
+        self.vao.attributes(self.vbo, (3, 3))
+
+    def draw(self, path):
+        # update VBO with the path, and draw it as a line strip
+        n = min(len(path), self.n_points)
+        self.data[:n, :3] = path[:n] @ T
+        update_vbo(self.vbo, self.data)
+
+        glLineWidth(1.0)
+        with self.program.use():
+            self.vao.draw(GL_LINE_STRIP, n)
 
 
 class Background:
@@ -324,8 +692,10 @@ class Background:
         self.data[:, 3:] = colors
 
         # Creates VBO rendering parameters
-        self.stride = self.data.itemsize * 6
         self.point_vbo = create_vbo(self.data)
+        self.program = Program(_COLOR_VERTEX, _COLOR_FRAGMENT, ("vertex", "color"))
+        self.vao = VertexArray()
+        self.vao.attributes(self.point_vbo, (3, 3))
 
     def _radial(self):
         # create spherical projection of stars
@@ -350,7 +720,8 @@ class Background:
         glDepthMask(GL_FALSE)
 
         glPointSize(1.0)
-        draw_vbo(self.point_vbo, self.stride, GL_POINTS, self.n_stars)
+        with self.program.use():
+            self.vao.draw(GL_POINTS, self.n_stars)
 
         glDepthMask(GL_TRUE)
         glClear(GL_DEPTH_BUFFER_BIT)
@@ -1,5 +1,6 @@
 import io
 import importlib.resources
+from contextlib import contextmanager
 
 import numpy as np
 from OpenGL.GL import *
@@ -18,34 +19,134 @@ def create_vbo(data):
     return vbo
 
 
-# function that updates the vbo (a buffer); using new data from the beggining of the buffer
-def update_vbo(vbo, data):
+# function that updates the vbo (a buffer); using new data from offset bytes into the buffer
+def update_vbo(vbo, data, offset=0):
     # change vertex buffer object data
     glBindBuffer(GL_ARRAY_BUFFER, vbo)
-    glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+    glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
     glBindBuffer(GL_ARRAY_BUFFER, 0)
 
 
-def draw_vbo(vbo, stride, draw_type, n, v_ptr=3, c_ptr=3):
-    # bind to VBO
-    glBindBuffer(GL_ARRAY_BUFFER, vbo)
-
-    # enable vertex followed by color within VBOs
-    glEnableClientState(GL_VERTEX_ARRAY)
-    glVertexPointer(v_ptr, GL_FLOAT, stride, ctypes.c_void_p(0))
-    glEnableClientState(GL_COLOR_ARRAY)
-
-    # calculate color offset (assuming data is tightly packed)
-    # color comes after vertex
-    size = stride // (v_ptr + c_ptr)
-    glColorPointer(c_ptr, GL_FLOAT, stride, ctypes.c_void_p(v_ptr * size))
-
-    # draw VBO
-    glDrawArrays(draw_type, 0, n)
-
-    glDisableClientState(GL_VERTEX_ARRAY)
-    glDisableClientState(GL_COLOR_ARRAY)
-    glBindBuffer(GL_ARRAY_BUFFER, 0)
+# compile and link a shader program, attributes are bound to the given
+# locations before linking
+def create_program(vertex, fragment, attributes=()):
+    program = glCreateProgram()
+    shaders = []
+    for kind, source in ((GL_VERTEX_SHADER, vertex), (GL_FRAGMENT_SHADER, fragment)):
+        shader = glCreateShader(kind)
+        glShaderSource(shader, source)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            raise RuntimeError(glGetShaderInfoLog(shader).decode())
+        glAttachShader(program, shader)
+        shaders.append(shader)
+
+    for location, name in enumerate(attributes):
+        glBindAttribLocation(program, location, name)
+    glLinkProgram(program)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        raise RuntimeError(glGetProgramInfoLog(program).decode())
+
+    # the program keeps the compiled code
+    for shader in shaders:
+        glDetachShader(program, shader)
+        glDeleteShader(shader)
+    return program
+
+
+# a linked shader program, the locations of its uniforms are looked up once
+class Program:
+    def __init__(self, vertex, fragment, attributes=()):
+        self.program = create_program(vertex, fragment, attributes)
+        self.locations = {}
+
+    def _location(self, name):
+        if name not in self.locations:
+            self.locations[name] = glGetUniformLocation(self.program, name)
+        return self.locations[name]
+
+    @contextmanager
+    def use(self, **uniforms):
+        # the program draws within the block, with the given uniforms:
+        # ints (samplers) or floats and vectors of up to 4 floats
+        glUseProgram(self.program)
+        for name, value in uniforms.items():
+            location = self._location(name)
+            if isinstance(value, (int, np.integer)):
+                glUniform1i(location, value)
+                continue
+            value = np.atleast_1d(value).astype(np.float32)
+            (glUniform1f, glUniform2f, glUniform3f, glUniform4f)[len(value) - 1](
+                location, *value
+            )
+        try:
+            yield
+        finally:
+            glUseProgram(0)
+
+
+# vertex array object, remembers which buffer feeds every attribute location
+# of a program, and how, so that a draw only binds it
+class VertexArray:
+    def __init__(self):
+        self.vao = glGenVertexArrays(1)
+        self.ebo = None
+
+    def attribute(self, location, vbo, size, stride=0, offset=0, divisor=0):
+        # float attribute of size components, one per vertex,
+        # or one per divisor instances
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glEnableVertexAttribArray(location)
+        glVertexAttribPointer(
+            location, size, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(offset)
+        )
+        glVertexAttribDivisor(location, divisor)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+    def attributes(self, vbo, sizes, location=0, divisor=0):
+        # consecutive attributes interleaved in vbo, from location on
+        stride = 4 * sum(sizes)
+        offset = 0
+        for i, size in enumerate(sizes):
+            self.attribute(location + i, vbo, size, stride, offset, divisor)
+            offset += 4 * size
+
+    def elements(self, indices):
+        # vertices of the draws given by an index buffer, replacing the
+        # previous one, firsts and counts of multi_draw are then in indices
+        glBindVertexArray(self.vao)
+        if self.ebo is not None:
+            glDeleteBuffers(1, [self.ebo])
+        self.ebo = glGenBuffers(1)
+        indices = indices.astype(np.uint32)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindVertexArray(0)
+
+    def draw(self, mode, n, first=0, instances=None):
+        # n vertices from first, once or for every instance
+        glBindVertexArray(self.vao)
+        if instances is None:
+            glDrawArrays(mode, first, n)
+        else:
+            glDrawArraysInstanced(mode, first, n, instances)
+        glBindVertexArray(0)
+
+    def multi_draw(self, mode, first, count):
+        # a primitive for every first vertex and count, in one call
+        glBindVertexArray(self.vao)
+        if self.ebo is None:
+            glMultiDrawArrays(
+                mode, first.astype(np.int32), count.astype(np.int32), len(first)
+            )
+        else:
+            offsets = (ctypes.c_void_p * len(first))(*(first * 4).tolist())
+            glMultiDrawElements(
+                mode, count.astype(np.int32), GL_UNSIGNED_INT, offsets, len(first)
+            )
+        glBindVertexArray(0)
 
 
 # function for initializing all of the images, the bits, their settings, their width and returns those parameters appropriated for the given images
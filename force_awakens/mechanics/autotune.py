@@ -0,0 +1,227 @@
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from force_awakens.mechanics.backends import BACKENDS
+from force_awakens.mechanics.barnes_hut import BarnesHut
+from force_awakens.mechanics.files import atomic_write
+from force_awakens.mechanics.forces import DirectSum
+from force_awakens.mechanics.parallel import ParallelSolver
+from force_awakens.mechanics.particle_mesh import ParticleMesh
+
+
+def _cache_path():
+    # per user cache directory
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(root, "force_awakens", "autotune.json")
+
+
+def _machine():
+    # decisions are only reused on the machine that measured them
+    return f"{platform.node()}-{platform.machine()}-{os.cpu_count()}"
+
+
+class Autotuner:
+    def __init__(
+        self,
+        theta=0.5,
+        grid=64,
+        backend="auto",
+        max_workers=None,
+        min_parallel=4096,
+        sample=256,
+        settle=16,
+        path=None,
+    ):
+        # settings of the candidate solvers: opening angle of the tree code,
+        # mesh points per axis, compute backend of the direct sum (auto tries
+        # every available one), and most worker processes, pools of powers
+        # of 2 up to max_workers are tried from min_parallel bodies
+        self.theta = theta
+        self.grid = grid
+        self.backend = backend
+        self.max_workers = max_workers if max_workers else os.cpu_count()
+        self.min_parallel = min_parallel
+
+        # candidates are timed on sample and 2 * sample targets,
+        # their cost for every target is extrapolated from both
+        self.sample = sample
+
+        # the body count is in another bucket for settle calls in a row
+        # before retuning, so that it going back and forth across a power
+        # of 2 does not retune every time
+        self.settle = settle
+        self._next = None
+        self._settling = 0
+
+        # own generator, the global one is left to the simulation
+        self._rng = np.random.default_rng(0)
+
+        # decisions of every machine, by body count bucket, read once
+        self.path = path if path else _cache_path()
+        self._cache = None
+
+        # solver in use, its name and worker processes, and the measured
+        # cost of every candidate for the current bucket (in seconds per
+        # force pass)
+        self.current = None
+        self.choice = None
+        self.workers = 1
+        self.costs = {}
+        self.bucket = None
+
+        self.potential = False
+        self.phi = None
+
+        self._solvers = {}
+
+    def _candidates(self, n):
+        # names of the solvers worth timing for n bodies
+        if self.backend == "auto":
+            backends = list(BACKENDS)
+        else:
+            backends = [self.backend if self.backend in BACKENDS else "numpy"]
+        names = [f"direct/{backend}" for backend in backends]
+        names += ["barnes_hut", "particle_mesh"]
+
+        if self.max_workers > 1 and n >= self.min_parallel:
+            names += [
+                f"{name} x{workers}"
+                for name in names
+                if getattr(self._solver(name), "shardable", True)
+                for workers in self._pools()
+            ]
+        return names
+
+    def _pools(self):
+        # worker counts tried, powers of 2 up to max_workers, and max_workers
+        pools = [2]
+        while pools[-1] * 2 < self.max_workers:
+            pools.append(pools[-1] * 2)
+        if pools[-1] != self.max_workers:
+            pools.append(self.max_workers)
+        return pools
+
+    def _solver(self, name):
+        # solvers are created on first use, and kept
+        if name in self._solvers:
+            return self._solvers[name]
+
+        base, _, workers = name.partition(" x")
+        if base.startswith("direct/"):
+            solver = DirectSum(backend=base.split("/")[1])
+        elif base == "barnes_hut":
+            solver = BarnesHut(theta=self.theta)
+        else:
+            solver = ParticleMesh(grid=self.grid)
+        if workers:
+            solver = ParallelSolver(solver, int(workers))
+
+        self._solvers[name] = solver
+        return solver
+
+    def _key(self, bucket):
+        return f"{bucket}-{self.theta}-{self.grid}-{self.backend}-{self.max_workers}"
+
+    def _load(self):
+        if self._cache is None:
+            try:
+                with open(self.path) as f:
+                    self._cache = json.load(f)
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save(self, cache):
+        # a failure keeps the previous cache
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with atomic_write(self.path, "w") as f:
+                json.dump(cache, f, indent=1)
+        except OSError:
+            pass
+
+    def _time(self, solver, s, m, G, targets):
+        # best of two force passes
+        best = np.inf
+        for _ in range(2):
+            start = time.perf_counter()
+            solver(s, m, G, targets)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def measure(self, s, m, G):
+        # cost of a force pass on every body for every candidate, on the live
+        # bodies: a + b * n from the time of k and 2k random targets
+        n = len(s)
+        costs = {}
+        for name in self._candidates(n):
+            solver = self._solver(name)
+            solver.potential = False
+
+            k = self.sample * getattr(solver, "workers", 1)
+            if 2 * k >= n:
+                costs[name] = self._time(solver, s, m, G, np.arange(n))
+                continue
+
+            targets = np.sort(self._rng.choice(n, 2 * k, replace=False))
+            t1 = self._time(solver, s, m, G, targets[::2])
+            t2 = self._time(solver, s, m, G, targets)
+            b = max(t2 - t1, 0.0) / k
+            costs[name] = max(t1 - b * k, 0.0) + b * n
+        return costs
+
+    def tune(self, s, m, G):
+        # decision for the body count bucket of s, from the cache of this
+        # machine, or measured and cached
+        n = len(s)
+        self.bucket = n.bit_length()
+        key = self._key(self.bucket)
+
+        cache = self._load()
+        decisions = cache.setdefault(_machine(), {})
+        decision = decisions.get(key)
+        if decision is None or decision["choice"] not in self._candidates(n):
+            costs = self.measure(s, m, G)
+            choice = min(costs, key=costs.get)
+            workers = getattr(self._solver(choice), "workers", 1)
+            decision = {"choice": choice, "workers": workers, "costs": costs}
+            decisions[key] = decision
+            self._save(cache)
+
+        self.choice = decision["choice"]
+        self.costs = decision["costs"]
+        # the other solvers, and their worker pools, are kept for the
+        # next time they are chosen
+        self.current = self._solver(self.choice)
+        self.workers = getattr(self.current, "workers", 1)
+
+    def __call__(self, s, m, G, targets=None):
+        # the body count crossed a power of 2, the best solver may change
+        bucket = len(s).bit_length()
+        if self.current is None:
+            self.tune(s, m, G)
+        elif bucket == self.bucket:
+            self._settling = 0
+        else:
+            self._settling = self._settling + 1 if bucket == self._next else 1
+            self._next = bucket
+            if self._settling >= self.settle:
+                self._settling = 0
+                self.tune(s, m, G)
+
+        self.current.potential = self.potential
+        a = self.current(s, m, G, targets)
+        self.phi = self.current.phi
+        return a
+
+    def close(self):
+        for solver in self._solvers.values():
+            if hasattr(solver, "close"):
+                solver.close()
+        self._solvers = {}
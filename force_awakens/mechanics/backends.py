@@ -0,0 +1,164 @@
+from collections import namedtuple
+
+import numpy as np
+
+# the jit backend is only available when numba is installed,
+# the import is attempted once, and is silently skipped otherwise
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# kernels of a compute backend:
+# direct(s, m, targets, eps, tile, potential) -> (a, phi), the direct sum
+#   acceleration (and potential, None unless asked for) of the targets due to
+#   every body, without the gravitational constant
+# update(x, y, idx, h), x[idx] += y[idx] * h, the drifts and kicks
+#   of the integrators
+Backend = namedtuple("Backend", ["name", "direct", "update"])
+
+# backend names accepted by select
+NAMES = ("auto", "numpy", "numba")
+
+
+def distances(dst, src, sq_dst, sq_src, eps=0.0):
+    # softened distance between every target of dst and source of src, over
+    # any leading batch axes, from their squared norms sq_dst and sq_src:
+    # |s_a - s_b|^2 = |s_a|^2 + |s_b|^2 - 2 s_a.s_b is one matrix product
+    d = dst @ np.swapaxes(src, -1, -2)
+    d *= -2
+    d += sq_dst[..., :, np.newaxis]
+    d += sq_src[..., np.newaxis, :]
+    d += eps**2
+
+    # the expansion above is not exact for (nearly) coincident
+    # bodies, keep d away from 0 so their force stays finite
+    np.maximum(d, 1e-6, out=d)
+    np.sqrt(d, out=d)
+    return d
+
+
+def _numpy_direct(s, m, targets, eps, tile, potential):
+    dst = s[targets]
+    a = np.zeros((len(dst), 3))
+    phi = np.zeros(len(dst)) if potential else None
+
+    # squared norms, for the distances of a whole block at once
+    sq = np.einsum("ij,ij->i", s, s)
+
+    for i in range(0, len(dst), tile):
+        s_dst, t_dst = dst[i : i + tile], targets[i : i + tile]
+
+        for j in range(0, len(s), tile):
+            s_src = s[j : j + tile]
+
+            # distance between every target and source of the block
+            d = distances(s_dst, s_src, sq[t_dst], sq[j : j + tile], eps)
+
+            # w = m_b / d^3, a body exerts no force on itself
+            own = t_dst[:, np.newaxis] == np.arange(j, j + len(s_src))
+            if potential:
+                u = m[j : j + tile] / d
+                u[own] = 0
+                phi[i : i + tile] -= u.sum(axis=1)
+            w = d * d * d
+            np.divide(m[j : j + tile], w, out=w)
+            w[own] = 0
+
+            # a = sum(m_b * (s_b - s_a) / d^3)
+            a[i : i + tile] += w @ s_src - s_dst * w.sum(axis=1)[:, np.newaxis]
+
+    return a, phi
+
+
+def _numpy_update(x, y, idx, h):
+    x[idx] += y[idx] * h
+
+
+# pure numpy reference, always available
+NUMPY = Backend("numpy", _numpy_direct, _numpy_update)
+
+# every available backend, by name
+BACKENDS = {"numpy": NUMPY}
+
+
+if numba is not None:
+    # compiled on first use, and cached on disk for the next runs
+
+    @numba.njit(parallel=True, cache=True)
+    def _numba_pairwise(s, m, targets, eps2, a, phi):
+        # one target per iteration, its sources in a plain loop,
+        # the differences are exact, no expansion is needed
+        for i in numba.prange(len(targets)):
+            t = targets[i]
+            x, y, z = s[t, 0], s[t, 1], s[t, 2]
+            ax, ay, az, p = 0.0, 0.0, 0.0, 0.0
+            for j in range(len(s)):
+                if j == t:
+                    continue
+                dx, dy, dz = s[j, 0] - x, s[j, 1] - y, s[j, 2] - z
+                d2 = max(dx * dx + dy * dy + dz * dz + eps2, 1e-6)
+                inv = 1.0 / np.sqrt(d2)
+                w = m[j] * inv * inv * inv
+                ax += w * dx
+                ay += w * dy
+                az += w * dz
+                p -= m[j] * inv
+            a[i, 0], a[i, 1], a[i, 2] = ax, ay, az
+            phi[i] = p
+
+    def _numba_direct(s, m, targets, eps, tile, potential):
+        a = np.empty((len(targets), 3))
+        phi = np.empty(len(targets))
+        _numba_pairwise(s, m, np.asarray(targets, dtype=np.int64), eps**2, a, phi)
+        return a, phi if potential else None
+
+    @numba.njit(parallel=True, cache=True)
+    def _numba_axpy(x, y, idx, h):
+        for k in numba.prange(len(idx)):
+            i = idx[k]
+            for c in range(x.shape[1]):
+                x[i, c] += y[i, c] * h
+
+    def _numba_update(x, y, idx, h):
+        _numba_axpy(x, y, np.asarray(idx, dtype=np.int64), float(h))
+
+    BACKENDS["numba"] = Backend("numba", _numba_direct, _numba_update)
+
+
+def select(name="auto"):
+    # the named backend, or the fastest available one for auto,
+    # an unavailable backend falls back to the numpy reference
+    if isinstance(name, Backend):
+        return name
+    if name == "auto":
+        name = "numba" if "numba" in BACKENDS else "numpy"
+    return BACKENDS.get(name, NUMPY)
+
+
+def conformance(n=1024, n_targets=300, eps=0.1, tile=256, seed=0):
+    # largest relative error of the kernels of every available backend
+    # against the numpy reference, on a random system around a black hole
+    rng = np.random.default_rng(seed)
+    s = rng.uniform(-10, 10, (n, 3))
+    v = rng.uniform(-1, 1, (n, 3))
+    m = rng.uniform(10, 30, n)
+    s[0], m[0] = 0, 800
+    targets = np.sort(rng.choice(n, n_targets, replace=False))
+
+    a_ref, phi_ref = NUMPY.direct(s, m, targets, eps, tile, True)
+    x_ref = s.copy()
+    NUMPY.update(x_ref, v, targets, 0.1)
+
+    def error(x, ref):
+        return np.max(np.linalg.norm(x - ref, axis=-1) / np.linalg.norm(ref, axis=-1))
+
+    errors = {}
+    for name, backend in BACKENDS.items():
+        a, phi = backend.direct(s, m, targets, eps, tile, True)
+        x = s.copy()
+        backend.update(x, v, targets, 0.1)
+        errors[name] = max(
+            error(a, a_ref), error(phi[:, None], phi_ref[:, None]), error(x, x_ref)
+        )
+    return errors
@@ -0,0 +1,183 @@
+import numpy as np
+
+# bits of morton key per axis, 3 * 21 bits fit in a 64 bit key
+DEPTH = 21
+
+
+def _spread(x):
+    # insert two zero bits between every bit of x (21 bit integers),
+    # so that the bits of three axes can be interleaved
+    x = x.astype(np.uint64) & np.uint64(0x1FFFFF)
+    x = (x | x << np.uint64(32)) & np.uint64(0x1F00000000FFFF)
+    x = (x | x << np.uint64(16)) & np.uint64(0x1F0000FF0000FF)
+    x = (x | x << np.uint64(8)) & np.uint64(0x100F00F00F00F00F)
+    x = (x | x << np.uint64(4)) & np.uint64(0x10C30C30C30C30C3)
+    x = (x | x << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton(s, lo, size):
+    # quantize positions on a 2^DEPTH grid spanning the bounding cube,
+    # and interleave the axes into a single z-order key
+    q = (s - lo) / size * (1 << DEPTH)
+    q = np.clip(q, 0, (1 << DEPTH) - 1).astype(np.uint64)
+    return (
+        _spread(q[:, 0])
+        | _spread(q[:, 1]) << np.uint64(1)
+        | _spread(q[:, 2]) << np.uint64(2)
+    )
+
+
+class Octree:
+    def __init__(self, s, m):
+        # bounding cube of all bodies
+        lo = s.min(axis=0)
+        size = float((s.max(axis=0) - lo).max()) * (1 + 1e-9)
+        self.size = size if size > 0 else 1.0
+
+        # sort bodies along the z-order curve, so that
+        # every node of the tree is a contiguous range of bodies
+        keys = morton(s, lo, self.size)
+        self.order = np.argsort(keys, kind="stable")
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(s))
+
+        keys = keys[self.order]
+        m, s = m[self.order], s[self.order]
+        ms = s * m[:, np.newaxis]
+
+        # nodes of every level, stored as flat arrays:
+        # first body, body count, mass and center of mass
+        self.start, self.count, self.mass, self.com = [], [], [], []
+
+        for level in range(DEPTH + 1):
+            prefix = keys >> np.uint64(3 * (DEPTH - level))
+            start = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            count = np.diff(np.r_[start, len(s)])
+
+            mass = np.add.reduceat(m, start)
+            com = np.add.reduceat(ms, start) / np.maximum(mass, 1e-300)[:, np.newaxis]
+
+            self.start.append(start)
+            self.count.append(count)
+            self.mass.append(mass)
+            self.com.append(com)
+
+            # every body sits in its own node, the tree is complete
+            if np.all(count == 1):
+                break
+
+        self.depth = len(self.start) - 1
+
+        # children of a node are the contiguous range of nodes of the
+        # next level, whose first body lies within the parent's range
+        self.child_first, self.child_end = [], []
+        for level in range(self.depth):
+            start, count = self.start[level], self.count[level]
+            below = self.start[level + 1]
+            self.child_first.append(np.searchsorted(below, start))
+            self.child_end.append(np.searchsorted(below, start + count))
+
+
+class BarnesHut:
+    def __init__(self, theta=0.5, eps=0.0, chunk=4096):
+        # opening angle, a node of width w at distance d is
+        # approximated as a point mass when w / d < theta:
+        # 0 is an exact direct sum, larger is faster and less accurate
+        self.theta = theta
+        self.eps = eps
+
+        # number of targets walking the tree at once,
+        # bounds the memory of the interaction lists
+        self.chunk = chunk
+
+        self.potential = False
+        self.phi = None
+
+        self.tree = None
+
+    def __call__(self, s, m, G, targets=None):
+        if targets is None:
+            targets = np.arange(len(s))
+
+        self.tree = Octree(s, m)
+
+        a = np.zeros((len(targets), 3))
+        phi = np.zeros(len(targets)) if self.potential else None
+        for i in range(0, len(targets), self.chunk):
+            idx = targets[i : i + self.chunk]
+            out = None if phi is None else phi[i : i + self.chunk]
+            a[i : i + self.chunk] = self._walk(s[idx], m[idx], self.tree.rank[idx], out)
+
+        self.phi = None if phi is None else G * phi
+        return G * a
+
+    def _walk(self, p, m_p, rank, phi=None):
+        tree = self.tree
+        n = len(p)
+        a = np.zeros((n, 3))
+
+        # every target starts at the root, frontier holds (target, node) pairs
+        # that are expanded one tree level at a time
+        tgt = np.arange(n)
+        node = np.zeros(n, dtype=int)
+
+        for level in range(tree.depth + 1):
+            start, count = tree.start[level][node], tree.count[level][node]
+            mass, com = tree.mass[level][node], tree.com[level][node]
+            width = tree.size / (1 << level)
+
+            # a node containing the target must always be opened,
+            # otherwise the body would attract itself
+            r = rank[tgt]
+            inside = (start <= r) & (r < start + count)
+
+            leaf = (count == 1) | (level == tree.depth)
+
+            # bodies stacked inside a leaf at the deepest level
+            # attract the target as one point mass, minus the target itself
+            stacked = inside & leaf & (count > 1)
+            if np.any(stacked):
+                own = m_p[tgt[stacked]]
+                rest = mass[stacked] - own
+                com[stacked] = (
+                    com[stacked] * mass[stacked, np.newaxis]
+                    - p[tgt[stacked]] * own[:, np.newaxis]
+                ) / np.maximum(rest, 1e-300)[:, np.newaxis]
+                mass[stacked] = rest
+
+            ds = com - p[tgt]
+            d2 = np.einsum("ij,ij->i", ds, ds) + self.eps**2
+
+            # same floor as the direct sum, for (nearly) coincident bodies
+            np.maximum(d2, 1e-6, out=d2)
+
+            far = ~inside & (width * width < self.theta**2 * d2)
+            use = np.flatnonzero(far | (leaf & ~inside) | stacked)
+
+            # accumulate the accepted nodes as point masses
+            d2 = d2[use]
+            w = mass[use] / (d2 * np.sqrt(d2))
+            t_use = tgt[use]
+            for k in range(3):
+                a[:, k] += np.bincount(t_use, w * ds[use, k], minlength=n)
+            if phi is not None:
+                phi -= np.bincount(t_use, mass[use] / np.sqrt(d2), minlength=n)
+
+            # open the remaining nodes, replacing them by their children
+            opened = ~far & ~leaf
+            if not np.any(opened):
+                break
+
+            first = tree.child_first[level][node[opened]]
+            n_child = tree.child_end[level][node[opened]] - first
+
+            tgt = np.repeat(tgt[opened], n_child)
+            node = np.repeat(first, n_child) + _ranges(n_child)
+
+        return a
+
+
+def _ranges(n):
+    # concatenated aranges, [0, n[0]) + [0, n[1]) + ...
+    return np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
@@ -0,0 +1,84 @@
+import numpy as np
+
+# cells are wrapped on a MOD^3 lattice to fit a 64 bit key, distant cells
+# sharing a key only add candidates that the distance test rejects
+MOD = 1 << 20
+
+# the cell itself and half of its 26 neighbours, every pair
+# of neighbouring cells is visited once
+_NEIGHBOURS = np.array(
+    [
+        (x, y, z)
+        for x in (-1, 0, 1)
+        for y in (-1, 0, 1)
+        for z in (-1, 0, 1)
+        if (x, y, z) >= (0, 0, 0)
+    ]
+)
+
+
+def _key(cell):
+    cell = cell % MOD
+    return (cell[:, 0] * MOD + cell[:, 1]) * MOD + cell[:, 2]
+
+
+def candidate_pairs(s, r):
+    # find every pair (i, j), i < j, closer than r, with a spatial hash:
+    # bodies are binned in cells of width r, so that a close pair always
+    # lies in the same or in neighbouring cells
+    if len(s) < 2 or r <= 0:
+        return np.empty((0, 2), dtype=int)
+
+    # bodies sorted by cell, every cell is a contiguous range
+    cell = np.floor(s / r).astype(np.int64)
+    key = _key(cell)
+    order = np.argsort(key)
+    key, cell = key[order], cell[order]
+
+    pairs = [np.empty((0, 2), dtype=int)]
+    for offset in _NEIGHBOURS:
+        # range of bodies in the neighbouring cell of every body,
+        # queried in cell order, which keeps the search cache friendly
+        near = _key(cell + offset)
+        lo = np.searchsorted(key, near, side="left")
+        n = np.searchsorted(key, near, side="right") - lo
+        if not np.any(n):
+            continue
+
+        # expand to (body, neighbour) candidates, in sorted order
+        i = np.repeat(np.arange(len(s)), n)
+        j = np.repeat(lo, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+
+        # within the same cell, only keep every pair once
+        if not np.any(offset):
+            keep = i < j
+            i, j = i[keep], j[keep]
+
+        # narrow phase, exact distance test
+        ds = s[order[j]] - s[order[i]]
+        close = np.einsum("ij,ij->i", ds, ds) < r**2
+        pairs.append(np.sort(order[np.stack((i[close], j[close]), axis=1)], axis=1))
+
+    return np.concatenate(pairs)
+
+
+def all_pairs(s, r, tile=256):
+    # find every pair (i, j), i < j, closer than r
+    # by testing every pair, block by block
+    sq = np.einsum("ij,ij->i", s, s)
+
+    pairs = [np.empty((0, 2), dtype=int)]
+    for i in range(0, len(s), tile):
+        for j in range(i, len(s), tile):
+            d2 = s[i : i + tile] @ s[j : j + tile].T
+            d2 *= -2
+            d2 += sq[i : i + tile, np.newaxis]
+            d2 += sq[np.newaxis, j : j + tile]
+
+            a, b = np.nonzero(d2 < r**2)
+            a, b = a + i, b + j
+
+            keep = a < b
+            pairs.append(np.stack((a[keep], b[keep]), axis=1))
+
+    return np.concatenate(pairs)
@@ -0,0 +1,150 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from force_awakens.mechanics.files import atomic_write
+
+
+def capture(engine, tracers=None):
+    # copy of the whole simulation state, run on the physics thread
+    # between two steps, so that it is consistent
+    n = engine.n
+    state = {f"body_{name}": getattr(engine, name)[:n].copy() for name in engine.fields}
+    state["ids"] = engine.ids[:n].copy()
+    state["free"] = np.array(engine.free, dtype=int)
+    state["next_id"] = np.array(engine.next_id)
+    state["time"] = np.array(engine.time)
+    state["evaluations"] = np.array(engine.evaluations)
+
+    # global random generator, bodies added after a restore
+    # are the same as without the restart
+    _, keys, pos, has_gauss, gauss = np.random.get_state()
+    state["rng_keys"] = keys
+    state["rng"] = np.array([pos, has_gauss, gauss])
+
+    if tracers is not None:
+        state["tracer_s"] = tracers.s.copy()
+        state["tracer_v"] = tracers.v.copy()
+        state["tracer_a"] = tracers.a.copy()
+        state["tracer_accumulator"] = np.array(tracers.clock.accumulator)
+
+    return state
+
+
+def render_state(planets, trails=None):
+    # intro of the planets, and the trails of every body, indexed by
+    # body id, 0 is the black hole
+    n = planets.n
+    if n <= 1:
+        return {}
+    state = {
+        "intro": planets.intro[1:n].copy(),
+        "intro_n": planets.frame[1:n].copy(),
+        "color": planets.color[1:n].copy(),
+    }
+    if trails is not None:
+        state["trail_point"] = trails.point[:, :n].copy()
+        state["trail_n"] = trails.count[:n].copy()
+        state["trail_head"] = np.array(trails.head)
+    return state
+
+
+def save(path, state):
+    # uncompressed, so that restoring is a copy of the file
+    with atomic_write(path) as f:
+        np.savez(f, **state)
+
+
+def load(path):
+    with np.load(path) as f:
+        return {name: f[name] for name in f.files}
+
+
+def restore_engine(engine, state, tracers=None):
+    # replace the bodies of the engine, and the random generator state
+    n = len(state["ids"])
+    next_id = int(state["next_id"])
+    engine.reserve(max(n, next_id))
+
+    for name in engine.fields:
+        getattr(engine, name)[:n] = state[f"body_{name}"]
+    engine.n = n
+    engine.ids[:n] = state["ids"]
+    engine.entry[:] = -1
+    engine.entry[engine.ids[:n]] = np.arange(n)
+    engine.free = state["free"].tolist()
+    engine.next_id = next_id
+    engine.time = float(state["time"])
+    engine.evaluations = int(state["evaluations"])
+
+    pos, has_gauss, gauss = state["rng"]
+    np.random.set_state(
+        ("MT19937", state["rng_keys"], int(pos), int(has_gauss), float(gauss))
+    )
+
+    if tracers is not None and "tracer_s" in state:
+        tracers.s = state["tracer_s"]
+        tracers.v = state["tracer_v"]
+        tracers.a = state["tracer_a"]
+        tracers.n = len(tracers.s)
+        tracers.clock.accumulator = float(state["tracer_accumulator"])
+
+
+def restore_render(planets, state, trails=None):
+    # intro of the planets, indexed by body id, and the trails of every id,
+    # checkpoints with a trail per planet, or with the trails laid out body
+    # by body, only restore the intro
+    if "intro" not in state:
+        return
+    n = min(len(state["intro"]) + 1, planets.n)
+    frame = state.get("intro_n", state.get("trail_n"))
+    planets.frame[1:n] = np.minimum(frame[: n - 1], planets.intro_n)
+    planets.intro[1:n] = state["intro"][: n - 1]
+    planets.color[1:n] = state["color"][: n - 1]
+
+    head = state.get("trail_head")
+    if trails is None or head is None or head.ndim:
+        return
+    if state["trail_point"].shape[0] != trails.length:
+        return
+    n = state["trail_n"]
+    trails.reserve(len(n))
+    trails.point[:, : len(n)] = state["trail_point"]
+    trails.count[: len(n)] = n
+    trails.head = int(head)
+    trails.upload()
+
+
+class Checkpointer:
+    def __init__(self, path, every=10.0):
+        # the state is saved to path every few seconds of wall clock time
+        self.path = path
+        self.every = every
+        self.last = time.perf_counter()
+
+        # state requested from the physics thread, and the writer thread,
+        # the renderer never waits for either
+        self._pending = None
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+    def update(self, physics, render=dict, now=None):
+        # called every frame: requests a capture when one is due, and hands
+        # it over to the writer with the render state once it is ready
+        if now is None:
+            now = time.perf_counter()
+
+        if self._pending is None:
+            if now - self.last >= self.every:
+                self.last = now
+                self._pending = physics.submit(
+                    lambda engine: capture(engine, physics.tracers)
+                )
+        elif self._pending.done():
+            state = self._pending.result()
+            self._pending = None
+            state.update(render())
+            self._writer.submit(save, self.path, state)
+
+    def close(self):
+        self._writer.shutdown(wait=True)
@@ -0,0 +1,75 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+# conserved quantities of the bodies at the middle of a sampled step
+Sample = namedtuple(
+    "Sample", ["time", "kinetic", "potential", "energy", "momentum", "angular"]
+)
+
+
+class Diagnostics:
+    def __init__(self, every=60, size=1024):
+        # a step out of every is sampled, with one more force pass
+        # for the potential of every body
+        self.every = every
+        self.steps = 0
+        self.due = False
+
+        # last samples, and the first one, that drift is measured from
+        self.samples = deque(maxlen=size)
+        self.first = None
+
+        self._v = None
+
+    def before(self, engine):
+        # ahead of the integration of a step
+        self.due = self.steps % self.every == 0
+        self.steps += 1
+        if self.due:
+            self._v = engine.v[: engine.n].copy()
+
+    def after(self, engine):
+        # once a sampled step is integrated: velocities and positions are
+        # averaged to the middle of the step, and the potential is computed
+        # there, whichever positions the integrator evaluated the forces at
+        if not self.due:
+            return
+
+        n = engine.n
+        m = engine.m[:n]
+        v = (self._v + engine.v[:n]) / 2
+        s = (engine.s_prev[:n] + engine.s[:n]) / 2
+
+        solver = engine.solver
+        solver.potential = True
+        solver(s, m, engine.G)
+        solver.potential = False
+
+        kinetic = 0.5 * np.sum(m * np.einsum("ij,ij->i", v, v))
+        potential = 0.5 * np.sum(m * solver.phi)
+        momentum = m @ v
+        angular = m @ np.cross(s, v)
+
+        sample = Sample(
+            engine.time, kinetic, potential, kinetic + potential, momentum, angular
+        )
+        if self.first is None:
+            self.first = sample
+        self.samples.append(sample)
+
+    def drift(self):
+        # change since the first sample: relative energy, absolute momentum
+        # (the black hole is held in place, momentum is not conserved),
+        # and relative angular momentum around the black hole, merges and
+        # bodies falling in the black hole also change them
+        if not self.samples:
+            return 0.0, 0.0, 0.0
+        first, last = self.first, self.samples[-1]
+
+        energy = abs(last.energy - first.energy) / max(abs(first.energy), 1e-300)
+        momentum = np.linalg.norm(last.momentum - first.momentum)
+        angular = np.linalg.norm(last.angular - first.angular) / max(
+            np.linalg.norm(first.angular), 1e-300
+        )
+        return energy, momentum, angular
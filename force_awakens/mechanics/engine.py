@@ -0,0 +1,245 @@
+import numpy as np
+
+from force_awakens.mechanics.autotune import Autotuner
+from force_awakens.mechanics.backends import select
+from force_awakens.mechanics.barnes_hut import BarnesHut
+from force_awakens.mechanics.broad_phase import candidate_pairs
+from force_awakens.mechanics.forces import DirectSum
+from force_awakens.mechanics.integrators import INTEGRATORS
+from force_awakens.mechanics.kepler import propagate
+from force_awakens.mechanics.merge import clusters, merge
+from force_awakens.mechanics.particle_mesh import ParticleMesh
+from force_awakens.mechanics.store import BodyStore
+
+# force backends selectable by name, solver(s, m, G, targets) returns the
+# accelerations of the targets (every body when None), and when its potential
+# attribute is set, also computes their potential, in its phi attribute
+SOLVERS = {
+    "direct": DirectSum,
+    "barnes_hut": BarnesHut,
+    "particle_mesh": ParticleMesh,
+    "auto": Autotuner,
+}
+
+
+class Engine(BodyStore):
+    def __init__(
+        self,
+        n_body=16,
+        G=6.6743e-2,
+        capacity=64,
+        black_hole_m=800,
+        black_hole_r=1,
+        merge_r=0.05,
+        solver="direct",
+        integrator="leapfrog",
+        backend="auto",
+        max_level=6,
+        eta=0.1,
+        kepler=0.0,
+        kepler_every=8,
+    ):
+        # the bodies, grown as they are added: masses, accelerations,
+        # velocities, positions, radii of the rendered spheres,
+        # positions before the last step (for the diagnostics at mid step),
+        # decay of the bodies that entered the black hole, block time steps,
+        # and bodies propagated on keplerian orbits
+        super().__init__(
+            {
+                "m": ((), float),
+                "a": ((3,), float),
+                "v": ((3,), float),
+                "s": ((3,), float),
+                "r": ((), float),
+                "s_prev": ((3,), float),
+                "decaying": ((), bool),
+                "decay": ((), np.float32),
+                "level": ((), int),
+                "stale": ((), bool),
+                "isolated": ((), bool),
+            },
+            capacity=capacity,
+        )
+
+        self.G = G
+        self.black_hole_r = black_hole_r
+        self.merge_r = merge_r
+
+        # force backend, computes the accelerations of the bodies
+        if isinstance(solver, str):
+            solver = SOLVERS[solver]()
+        self.solver = solver
+
+        # time integration scheme, and compute backend of its drifts and kicks
+        self.integrator = integrator
+        self.backend = select(backend)
+
+        # block time steps, bodies step by dt / 2^level with
+        # level <= max_level, chosen from eta * |a| / |jerk|
+        self.max_level = max_level
+        self.eta = eta
+
+        # bodies perturbed by the others by less than a fraction kepler
+        # of the attraction of the black hole follow their keplerian orbit
+        # about it, checked every kepler_every steps (0 disables it)
+        self.kepler = kepler
+        self.kepler_every = kepler_every
+        self.n_kepler = 0
+        self._steps = 0
+
+        # number of accelerations computed, over all steps
+        self.evaluations = 0
+
+        # simulated seconds since the start, and when set,
+        # the recorder every step is written to
+        self.time = 0.0
+        self.recorder = None
+
+        # when set, samples the energy and momenta of the bodies
+        self.diagnostics = None
+
+        # Sets the mass, velocity, and position of the central black hole,
+        # it is always the first body
+        self.add(np.zeros(3), np.zeros(3), black_hole_m, black_hole_r)
+
+        # Initialises the masses, velocities, and positions of n_body - 1 planets
+        for _ in range(n_body - 1):
+            s = np.random.uniform(-10, 10, 3)
+            v = np.random.randint(-1, 1, 3).astype(float)
+            self.add(s, v)
+
+    def accelerations(self, idx):
+        # gravitational acceleration on bodies idx, due to all active bodies
+        if len(idx) == 0:
+            return np.zeros((0, 3))
+        self.evaluations += len(idx)
+        n = self.n
+        return self.solver(self.s[:n], self.m[:n], self.G, idx)
+
+    def add(self, s, v, m=None, r=None):
+        # add a body, and return its id
+        if m is None:
+            m = float(np.random.randint(10, 30))
+        if r is None:
+            r = m * 0.01
+
+        return self.append(s=s, s_prev=s, v=v, m=m, r=r, decay=1.0, stale=True)
+
+    def _merge(self):
+        # bodies closer than merge_r collide, every cluster of
+        # colliding bodies merges into its body of smallest index
+        pairs = candidate_pairs(self.s[: self.n], self.merge_r)
+        if len(pairs) == 0:
+            return
+
+        # only the bodies involved in a collision
+        idx = np.unique(pairs)
+        local = np.searchsorted(idx, pairs)
+
+        labels = clusters(local, len(idx))
+        roots, m, s, v, r = merge(
+            labels, self.m[idx], self.s[idx], self.v[idx], self.r[idx]
+        )
+
+        # update the merged bodies, and remove the absorbed ones
+        absorbed = np.delete(idx, roots)
+        idx = idx[roots]
+        self.m[idx], self.s[idx], self.v[idx], self.r[idx] = m, s, v, r
+        self.stale[idx] = True
+        self.remove(absorbed)
+
+    def _decay(self, dt):
+        n = self.n
+        decaying, decay = self.decaying[:n], self.decay[:n]
+
+        # If the body is too close to the black hole,
+        # commences it's decay animation
+        decaying |= np.linalg.norm(self.s[:n], axis=1) < self.black_hole_r
+        decaying[0] = False
+
+        # Continually decays the trails of all bodies that
+        # have entered the black hole until they disappear,
+        # by 5% every 60th of a second
+        decay[decaying] *= 0.95 ** (dt * 60)
+        self.v[:n][decaying] = 0
+
+        self.remove(np.flatnonzero(decaying & (decay < 0.05)))
+
+    def _propagate(self, phys, dt):
+        # isolated bodies leave phys, and are moved half a step on their
+        # orbit, where they attract the others during the step, their end
+        # of step state is returned, bodies the kepler solver did not
+        # converge for are integrated with the others
+        kepler = phys[self.isolated[phys]]
+        s, v = self.s[kepler], self.v[kepler]
+        mu = self.G * self.m[0]
+        s_half, _, half = propagate(s, v, mu, dt / 2)
+        s_end, v_end, end = propagate(s, v, mu, dt)
+
+        ok = half & end
+        self.isolated[kepler[~ok]] = False
+        self.stale[kepler[~ok]] = True
+        kepler = kepler[ok]
+        self.s[kepler] = s_half[ok]
+
+        return phys[~self.isolated[phys]], kepler, s_end[ok], v_end[ok]
+
+    def _isolate(self):
+        # every kepler_every steps, a force pass on every body at the end of
+        # the step: bodies whose acceleration differs from the attraction of
+        # the black hole alone by less than kepler are isolated, the
+        # others integrated with full forces
+        self._steps += 1
+        if (self._steps - 1) % self.kepler_every:
+            return
+
+        n = self.n
+        phys = np.flatnonzero(~self.decaying[:n])
+        phys = phys[phys != 0]
+        s = self.s[phys]
+        a = self.accelerations(phys)
+        a_kepler = -self.G * self.m[0] * s / np.linalg.norm(s, axis=1)[:, None] ** 3
+
+        perturbation = np.linalg.norm(a - a_kepler, axis=1)
+        isolated = perturbation < self.kepler * np.linalg.norm(a_kepler, axis=1)
+
+        # accelerations of bodies changing mode are outdated when they are
+        # next integrated
+        self.stale[phys[self.isolated[phys] != isolated]] = True
+        self.isolated[:n] = False
+        self.isolated[phys] = isolated
+        self.n_kepler = int(isolated.sum())
+
+    def step(self, dt):
+        self.s_prev[: self.n] = self.s[: self.n]
+
+        self._merge()
+        self._decay(dt)
+
+        # If the body is not decaying, then new accelerations,
+        # velocities, and positions are calculated for it
+        phys = np.flatnonzero(~self.decaying[: self.n])
+        if self.diagnostics is not None:
+            self.diagnostics.before(self)
+
+        # isolated bodies follow their orbit about the black hole
+        kepler = None
+        if self.kepler:
+            phys, kepler, s_end, v_end = self._propagate(phys, dt)
+
+        INTEGRATORS[self.integrator](self, dt, phys)
+        if kepler is not None:
+            self.s[kepler], self.v[kepler] = s_end, v_end
+
+        # Resets the position and velocity of the black hole to zero,
+        # to ensure it doesn't move
+        self.v[0] = 0
+        self.s[0] = 0
+
+        self.time += dt
+        if self.diagnostics is not None:
+            self.diagnostics.after(self)
+        if self.kepler:
+            self._isolate()
+        if self.recorder is not None:
+            self.recorder.record(self)
@@ -0,0 +1,160 @@
+import numpy as np
+
+from force_awakens.mechanics.backends import NUMPY, distances
+from force_awakens.mechanics.integrators import leapfrog
+from force_awakens.mechanics.merge import clusters, merge
+
+
+def _per_scenario(value, e):
+    # a scalar is shared by every scenario, or one value per scenario
+    return np.broadcast_to(np.asarray(value, dtype=float), (e,)).copy()
+
+
+class Ensemble:
+    def __init__(
+        self,
+        n_scenario=1000,
+        n_body=16,
+        G=6.6743e-2,
+        black_hole_m=800,
+        black_hole_r=1,
+        v_scale=1.0,
+        merge_r=0.05,
+        eps=0.0,
+        chunk=1 << 22,
+    ):
+        # n_scenario independent systems of n_body bodies, advanced together:
+        # every state array has a leading scenario axis, and a step is
+        # the same few array operations whatever the number of scenarios
+        e, n = n_scenario, n_body
+        self.n_scenario = e
+        self.n_body = n
+
+        # parameters of every scenario
+        self.G = _per_scenario(G, e)
+        self.black_hole_r = _per_scenario(black_hole_r, e)
+        self.v_scale = _per_scenario(v_scale, e)
+
+        self.merge_r = merge_r
+        self.eps = eps
+
+        # scenarios are processed in chunks, so that the pairwise
+        # distance arrays never hold more than chunk entries
+        self.chunk = chunk
+
+        # bodies of every scenario, spawned as by the engine,
+        # the velocities scaled per scenario
+        self.m = np.random.randint(10, 30, (e, n)).astype(float)
+        self.s = np.random.uniform(-10, 10, (e, n, 3))
+        self.v = np.random.randint(-1, 1, (e, n, 3)) * self.v_scale[:, None, None]
+        self.a = np.zeros((e, n, 3))
+        self.r = self.m * 0.01
+
+        # the central black hole of every scenario is its first body
+        self.m[:, 0] = _per_scenario(black_hole_m, e)
+        self.r[:, 0] = self.black_hole_r
+        self.s[:, 0] = 0
+        self.v[:, 0] = 0
+
+        # bodies still simulated in every scenario, merged bodies
+        # and bodies that fell in the black hole are masked out
+        self.mask = np.ones((e, n), dtype=bool)
+
+        self.time = 0.0
+        self.evaluations = 0
+
+        # the integrators of the engine step the active bodies
+        # of every scenario at once, selected by the mask
+        self.backend = NUMPY
+
+    def _distances(self, lo, hi, eps=0.0):
+        # distance between every pair of bodies of scenarios lo:hi
+        s = self.s[lo:hi]
+        sq = np.einsum("eij,eij->ei", s, s)
+        return distances(s, s, sq, sq, eps)
+
+    def _scenarios(self):
+        # ranges of scenarios of at most chunk pairwise entries
+        step = max(self.chunk // self.n_body**2, 1)
+        for lo in range(0, self.n_scenario, step):
+            yield lo, min(lo + step, self.n_scenario)
+
+    def accelerations(self, live):
+        # acceleration of the bodies live due to the active bodies
+        # of their scenario
+        a = np.zeros_like(self.s)
+        diagonal = np.arange(self.n_body)
+        for lo, hi in self._scenarios():
+            d = self._distances(lo, hi, self.eps)
+
+            # w = m_b / d^3, masked bodies and the body itself exert no force
+            w = d * d * d
+            np.divide((self.m[lo:hi] * self.mask[lo:hi])[:, np.newaxis, :], w, out=w)
+            w[:, diagonal, diagonal] = 0
+
+            s = self.s[lo:hi]
+            a[lo:hi] = w @ s - s * w.sum(axis=2)[:, :, np.newaxis]
+            a[lo:hi] *= self.G[lo:hi, np.newaxis, np.newaxis]
+
+        self.evaluations += int(self.mask.sum())
+        return a[live]
+
+    def _merge(self):
+        # bodies of the same scenario closer than merge_r merge, the pairs
+        # never span two scenarios, so they are clustered all at once
+        n = self.n_body
+        upper = np.triu(np.ones((n, n), dtype=bool), 1)
+        pairs = []
+        for lo, hi in self._scenarios():
+            close = self._distances(lo, hi) < self.merge_r
+            mask = self.mask[lo:hi]
+            close &= mask[:, :, np.newaxis] & mask[:, np.newaxis, :] & upper
+            e, i, j = np.nonzero(close)
+            pairs.append(np.stack([(lo + e) * n + i, (lo + e) * n + j], axis=1))
+
+        pairs = np.concatenate(pairs)
+        if len(pairs) == 0:
+            return
+
+        # only the bodies involved in a collision, as flat indices
+        idx = np.unique(pairs)
+        local = np.searchsorted(idx, pairs)
+        labels = clusters(local, len(idx))
+
+        m, s, v, r = (
+            self.m.reshape(-1),
+            self.s.reshape(-1, 3),
+            self.v.reshape(-1, 3),
+            self.r.reshape(-1),
+        )
+        roots, m_root, s_root, v_root, r_root = merge(
+            labels, m[idx], s[idx], v[idx], r[idx]
+        )
+
+        # mask the absorbed bodies, and update the merged ones
+        mask = self.mask.reshape(-1)
+        mask[idx] = False
+        idx = idx[roots]
+        mask[idx] = True
+        m[idx], s[idx], v[idx], r[idx] = m_root, s_root, v_root, r_root
+
+    def step(self, dt):
+        self._merge()
+
+        # bodies that fell in the black hole of their scenario are removed
+        d = np.linalg.norm(self.s, axis=2)
+        self.mask &= d >= self.black_hole_r[:, np.newaxis]
+        self.mask[:, 0] = True
+
+        # leapfrog of every scenario at once, masked bodies are left in place
+        leapfrog(self, dt, self.mask)
+
+        # the black holes do not move
+        self.s[:, 0] = 0
+        self.v[:, 0] = 0
+
+        self.time += dt
+
+    def survivors(self):
+        # number of active bodies of every scenario
+        return self.mask.sum(axis=1)
@@ -0,0 +1,12 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="wb"):
+    # file written next to path and renamed over it once complete,
+    # a crash while writing keeps the previous one
+    tmp = f"{path}.tmp"
+    with open(tmp, mode) as f:
+        yield f
+    os.replace(tmp, path)
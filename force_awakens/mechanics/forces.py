@@ -0,0 +1,26 @@
+import numpy as np
+
+from force_awakens.mechanics.backends import select
+
+
+class DirectSum:
+    def __init__(self, tile=256, eps=0.0, backend="auto"):
+        # the numpy kernel processes bodies in tile x tile blocks, so that
+        # the pairwise distance arrays never hold more than tile**2 entries
+        self.tile = tile
+        self.eps = eps
+
+        # compute backend of the pairwise kernel
+        self.backend = select(backend)
+
+        self.potential = False
+        self.phi = None
+
+    def __call__(self, s, m, G, targets=None):
+        # acceleration of the target bodies due to every body in s,
+        # targets are indices into s (all bodies when None)
+        if targets is None:
+            targets = np.arange(len(s))
+        a, phi = self.backend.direct(s, m, targets, self.eps, self.tile, self.potential)
+        self.phi = G * phi if self.potential else None
+        return G * a
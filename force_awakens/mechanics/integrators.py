@@ -0,0 +1,141 @@
+import numpy as np
+
+# 4th order yoshida weights, three leapfrog steps of h * w1, h * w0, h * w1
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = 1 - 2 * _W1
+
+# drift and kick coefficients of the composed steps
+_YOSHIDA_C = (_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2)
+_YOSHIDA_D = (_W1, _W0, _W1)
+
+
+def euler(engine, h, phys):
+    # semi-implicit euler, one force evaluation per step
+    update = engine.backend.update
+    engine.a[phys] = engine.accelerations(phys)
+    update(engine.v, engine.a, phys, h)
+    update(engine.s, engine.v, phys, h)
+
+
+def leapfrog(engine, h, phys):
+    # drift-kick-drift leapfrog, symplectic and second order,
+    # one force evaluation per step
+    update = engine.backend.update
+    update(engine.s, engine.v, phys, h / 2)
+    engine.a[phys] = engine.accelerations(phys)
+    update(engine.v, engine.a, phys, h)
+    update(engine.s, engine.v, phys, h / 2)
+
+
+def yoshida4(engine, h, phys):
+    # fourth order yoshida, three force evaluations per step
+    update = engine.backend.update
+    for c, d in zip(_YOSHIDA_C, _YOSHIDA_D):
+        update(engine.s, engine.v, phys, c * h)
+        engine.a[phys] = engine.accelerations(phys)
+        update(engine.v, engine.a, phys, d * h)
+    update(engine.s, engine.v, phys, _YOSHIDA_C[-1] * h)
+
+
+def block(engine, h, phys):
+    # hierarchical block time steps: a body at level k steps by h / 2^k,
+    # and only the bodies ending their step have their forces recomputed,
+    # h is divided in 2^max_level ticks of the smallest step
+    top = engine.max_level
+    n_tick = 1 << top
+    tick_dt = h / n_tick
+
+    # accelerations of new bodies are unknown, start them at the smallest step
+    stale = phys[engine.stale[phys]]
+    engine.a[stale] = engine.accelerations(stale)
+    engine.level[stale] = top
+    engine.stale[stale] = False
+
+    # all bodies are synchronized at the start of the block, opening half kick
+    dt = h / (1 << engine.level[phys])
+    engine.v[phys] += engine.a[phys] * (dt / 2)[:, np.newaxis]
+
+    for tick in range(1, n_tick + 1):
+        # drifting is cheap, every body drifts every tick
+        engine.backend.update(engine.s, engine.v, phys, tick_dt)
+
+        # bodies whose step ends at this tick
+        stride = n_tick >> engine.level[phys]
+        active = phys[tick % stride == 0]
+        dt = h / (1 << engine.level[active])
+
+        # closing half kick with the new accelerations
+        a_old = engine.a[active]
+        engine.a[active] = engine.accelerations(active)
+        engine.v[active] += engine.a[active] * (dt / 2)[:, np.newaxis]
+
+        # next step from the acceleration and its rate of change (jerk),
+        # dt = eta * |a| / |jerk|, a fraction of the local orbital time scale
+        a_mag = np.linalg.norm(engine.a[active], axis=1)
+        jerk = np.linalg.norm(engine.a[active] - a_old, axis=1) / dt
+        with np.errstate(divide="ignore", invalid="ignore"):
+            want = engine.eta * a_mag / jerk
+            level = np.ceil(np.log2(h / want))
+        level = np.clip(np.nan_to_num(level, nan=0), 0, top).astype(int)
+
+        # a longer step must start on a tick aligned to it,
+        # a shorter step is always aligned
+        aligned = top - _trailing_zeros(tick, top)
+        engine.level[active] = np.maximum(level, aligned)
+
+        # opening half kick of the next step, the next block does it
+        # for the bodies reaching its end
+        if tick < n_tick:
+            dt = h / (1 << engine.level[active])
+            engine.v[active] += engine.a[active] * (dt / 2)[:, np.newaxis]
+
+
+def _trailing_zeros(tick, top):
+    # number of times tick divides by 2, at most top
+    zeros = 0
+    while zeros < top and tick % 2 == 0:
+        tick //= 2
+        zeros += 1
+    return zeros
+
+
+INTEGRATORS = {
+    "euler": euler,
+    "leapfrog": leapfrog,
+    "yoshida4": yoshida4,
+    "block": block,
+}
+
+
+class FixedStep:
+    def __init__(self, engine, h=1 / 120, max_substeps=8, warp=1.0):
+        # the engine always advances by steps of h, simulated seconds
+        self.engine = engine
+        self.h = h
+
+        # at most max_substeps are run per frame, when the simulation
+        # falls further behind, the backlog is dropped instead of
+        # stalling the renderer
+        self.max_substeps = max_substeps
+
+        # simulated seconds per wall clock second
+        self.warp = warp
+
+        # time not yet simulated
+        self.accumulator = 0.0
+        self.substeps = 0
+
+    def advance(self, dt):
+        # run as many fixed steps as fit in the elapsed (warped) time
+        self.accumulator += dt * self.warp
+
+        self.substeps = 0
+        while self.accumulator >= self.h and self.substeps < self.max_substeps:
+            self.engine.step(self.h)
+            self.accumulator -= self.h
+            self.substeps += 1
+
+        # too far behind, drop the time that could not be simulated
+        self.accumulator = min(self.accumulator, self.h)
+
+        return self.substeps
@@ -0,0 +1,77 @@
+import numpy as np
+
+
+def stumpff(z):
+    # stumpff functions C(z) and S(z) of the universal variable formulation,
+    # trigonometric for ellipses, hyperbolic for hyperbolas,
+    # and their series near parabolas
+    c, s = np.empty_like(z), np.empty_like(z)
+    ell, hyp = z > 1e-4, z < -1e-4
+    par = ~(ell | hyp)
+
+    q = np.sqrt(z[ell])
+    c[ell] = (1 - np.cos(q)) / z[ell]
+    s[ell] = (q - np.sin(q)) / q**3
+
+    q = np.sqrt(-z[hyp])
+    c[hyp] = (np.cosh(q) - 1) / -z[hyp]
+    s[hyp] = (np.sinh(q) - q) / q**3
+
+    z = z[par]
+    c[par] = 1 / 2 - z / 24 + z**2 / 720
+    s[par] = 1 / 6 - z / 120 + z**2 / 5040
+    return c, s
+
+
+def propagate(s, v, mu, t, tol=1e-12, max_iter=32):
+    # positions and velocities after t of bodies on keplerian orbits about
+    # a fixed mass at the origin, for every orbit type at once, and which
+    # bodies the solver converged for (the others are left unchanged)
+    sqrt_mu = np.sqrt(mu)
+    r0 = np.linalg.norm(s, axis=1)
+    sigma = np.einsum("ij,ij->i", s, v) / sqrt_mu
+    alpha = 2 / r0 - np.einsum("ij,ij->i", v, v) / mu
+    t = np.broadcast_to(t, r0.shape)
+
+    # laguerre-conway iterations on the universal anomaly chi, which converge
+    # from about any first guess, over a short t the anomaly is close to
+    # the one at constant radius r0, bodies it overflows for over long
+    # times are reported as not converged
+    n = 5
+    with np.errstate(over="ignore", invalid="ignore"):
+        chi = sqrt_mu * t / r0
+        for _ in range(max_iter):
+            z = alpha * chi**2
+            c, st = stumpff(z)
+            chi2 = chi * chi
+
+            # universal kepler equation, and its first two derivatives
+            # (the first one is the radius)
+            f = sigma * chi2 * c + (1 - alpha * r0) * chi2 * chi * st + r0 * chi
+            f -= sqrt_mu * t
+            df = sigma * chi * (1 - z * st) + (1 - alpha * r0) * chi2 * c + r0
+            ddf = sigma * (1 - z * c) + (1 - alpha * r0) * chi * (1 - z * st)
+
+            root = np.sqrt(np.abs((n - 1) ** 2 * df**2 - n * (n - 1) * f * ddf))
+            delta = n * f / (df + np.copysign(root, df))
+            chi = chi - delta
+            converged = np.abs(delta) <= tol * np.abs(chi)
+            if converged.all():
+                break
+    converged &= np.isfinite(chi)
+    chi = np.where(converged, chi, 0.0)
+
+    # lagrange coefficients, the new state is a combination of the old one
+    z = alpha * chi**2
+    c, st = stumpff(z)
+    chi2 = chi * chi
+    f = 1 - chi2 / r0 * c
+    g = t - chi2 * chi * st / sqrt_mu
+    s1 = f[:, np.newaxis] * s + g[:, np.newaxis] * v
+    r = np.linalg.norm(s1, axis=1)
+    df = sqrt_mu / (r * r0) * (alpha * chi2 * chi * st - chi)
+    dg = 1 - chi2 / r * c
+    v1 = df[:, np.newaxis] * s + dg[:, np.newaxis] * v
+
+    s1[~converged], v1[~converged] = s[~converged], v[~converged]
+    return s1, v1, converged
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def clusters(pairs, n):
+    # array based union-find: label every body with the smallest index
+    # of the cluster of bodies it is connected to through pairs
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+
+    i, j = pairs[:, 0], pairs[:, 1]
+    while True:
+        # link both ends of every pair to the smaller label
+        low = np.minimum(labels[i], labels[j])
+        before = labels.copy()
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+
+        # pointer jumping, point every body at its root
+        labels = labels[labels]
+        while np.any(labels != labels[labels]):
+            labels = labels[labels]
+
+        if np.array_equal(labels, before):
+            return labels
+
+
+def merge(labels, m, s, v, r):
+    # combine every cluster into its root, conserving mass and momentum:
+    # mass weighted position and velocity, and volume conserving radius
+    n = len(m)
+    mass = np.bincount(labels, m, minlength=n)
+    w = m / mass[labels]
+
+    s_root = np.zeros((n, 3))
+    v_root = np.zeros((n, 3))
+    for k in range(3):
+        s_root[:, k] = np.bincount(labels, w * s[:, k], minlength=n)
+        v_root[:, k] = np.bincount(labels, w * v[:, k], minlength=n)
+    r_root = np.cbrt(np.bincount(labels, r**3, minlength=n))
+
+    roots = np.unique(labels)
+    return roots, mass[roots], s_root[roots], v_root[roots], r_root[roots]
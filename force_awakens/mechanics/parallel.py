@@ -0,0 +1,210 @@
+import time
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _arrays(blocks, capacity):
+    # map the shared blocks as numpy arrays: positions, masses,
+    # target indices, and the resulting accelerations and potentials
+    return (
+        np.ndarray((capacity, 3), dtype=np.float64, buffer=blocks[0].buf),
+        np.ndarray(capacity, dtype=np.float64, buffer=blocks[1].buf),
+        np.ndarray(capacity, dtype=np.int64, buffer=blocks[2].buf),
+        np.ndarray((capacity, 3), dtype=np.float64, buffer=blocks[3].buf),
+        np.ndarray(capacity, dtype=np.float64, buffer=blocks[4].buf),
+    )
+
+
+def _worker(conn, solver):
+    # worker process, computes the accelerations of a block of targets
+    # reading positions and masses from shared memory, and writing
+    # the accelerations back into it: only commands go through the pipe
+    blocks, arrays = [], None
+
+    while True:
+        command, *args = conn.recv()
+
+        if command == "attach":
+            names, capacity = args
+            arrays = None
+            for block in blocks:
+                block.close()
+            blocks = [shared_memory.SharedMemory(name=name) for name in names]
+            arrays = _arrays(blocks, capacity)
+            conn.send(None)
+
+        elif command == "run":
+            n, lo, hi, G, params = args
+            start = time.perf_counter()
+
+            # scalar settings of the solver may change between steps
+            for name, value in params.items():
+                setattr(solver, name, value)
+
+            s, m, targets, a, phi = arrays
+            if hi > lo:
+                a[lo:hi] = solver(s[:n], m[:n], G, targets[lo:hi])
+                if solver.phi is not None:
+                    phi[lo:hi] = solver.phi
+            conn.send(time.perf_counter() - start)
+
+        elif command == "stop":
+            arrays = None
+            for block in blocks:
+                block.close()
+            conn.close()
+            return
+
+
+def _shutdown(procs, conns, blocks):
+    # stop the workers, and release the shared memory
+    for conn in conns:
+        try:
+            conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+    for proc in procs:
+        proc.join(timeout=1)
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+class ParallelSolver:
+    def __init__(self, solver, workers=None, min_targets=256, calibrate=100):
+        # force backend run on every worker, each worker computes
+        # the accelerations of a contiguous block of targets
+        self.solver = solver
+        self.workers = workers if workers else mp.cpu_count()
+
+        # below this many targets, the overhead of the pool is
+        # larger than the work, compute in this process instead
+        self.min_targets = min_targets
+
+        # duration of the last parallel call, and time spent computing by
+        # every worker, every calibrate parallel calls the same call is also
+        # timed in this process: speedup of the pool over it, and that
+        # speedup per worker
+        self.calibrate = calibrate
+        self.wall = 0.0
+        self.busy = []
+        self.serial = 0.0
+        self.speedup = 1.0
+        self.efficiency = 1.0
+        self._calls = 0
+
+        self.potential = False
+        self.phi = None
+
+        self.capacity = 0
+        self._procs, self._conns, self._blocks = [], [], []
+        self._arrays = None
+        self._finalizer = None
+
+    def _start(self):
+        # spawn, so that workers never inherit the OpenGL context
+        ctx = mp.get_context("spawn")
+        for _ in range(self.workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child, self.solver), daemon=True)
+            proc.start()
+            self._procs.append(proc)
+            self._conns.append(parent)
+
+        self._finalizer = weakref.finalize(
+            self, _shutdown, self._procs, self._conns, self._blocks
+        )
+
+    def _reserve(self, n):
+        # grow the shared blocks geometrically, and reattach the workers
+        if n <= self.capacity:
+            return
+        capacity = max(1024, self.capacity)
+        while capacity < n:
+            capacity *= 2
+
+        sizes = (
+            capacity * 3 * 8,
+            capacity * 8,
+            capacity * 8,
+            capacity * 3 * 8,
+            capacity * 8,
+        )
+        blocks = [shared_memory.SharedMemory(create=True, size=size) for size in sizes]
+        self._arrays = _arrays(blocks, capacity)
+
+        names = [block.name for block in blocks]
+        for conn in self._conns:
+            conn.send(("attach", names, capacity))
+        for conn in self._conns:
+            conn.recv()
+
+        # previous blocks are no longer used by any worker
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks[:] = blocks
+        self.capacity = capacity
+
+    def __call__(self, s, m, G, targets=None):
+        if targets is None:
+            targets = np.arange(len(s))
+        self.solver.potential = self.potential
+
+        # solvers whose work is global (the mesh solve) would repeat it
+        # on every worker, they run in this process
+        if len(targets) < self.min_targets or not getattr(
+            self.solver, "shardable", True
+        ):
+            a = self.solver(s, m, G, targets)
+            self.phi = self.solver.phi
+            return a
+
+        if not self._procs:
+            self._start()
+        self._reserve(len(s))
+
+        start = time.perf_counter()
+        s_shared, m_shared, t_shared, a_shared, phi_shared = self._arrays
+        n, n_targets = len(s), len(targets)
+        s_shared[:n] = s
+        m_shared[:n] = m
+        t_shared[:n_targets] = targets
+
+        # scalar settings of the solver, e.g. the opening angle
+        params = {
+            name: value
+            for name, value in vars(self.solver).items()
+            if isinstance(value, (int, float))
+        }
+
+        bounds = np.linspace(0, n_targets, self.workers + 1).astype(int)
+        for conn, lo, hi in zip(self._conns, bounds[:-1], bounds[1:]):
+            conn.send(("run", n, lo, hi, G, params))
+        self.busy = [conn.recv() for conn in self._conns]
+
+        a = a_shared[:n_targets].copy()
+        self.phi = phi_shared[:n_targets].copy() if self.potential else None
+        self.wall = time.perf_counter() - start
+
+        if self._calls % self.calibrate == 0:
+            start = time.perf_counter()
+            self.solver(s, m, G, targets)
+            self.serial = time.perf_counter() - start
+            self.speedup = self.serial / self.wall
+            self.efficiency = self.speedup / self.workers
+        self._calls += 1
+
+        return a
+
+    def close(self):
+        # the pool is started again on the next call
+        self._arrays = None
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = None
+        self._procs, self._conns, self._blocks = [], [], []
+        self.capacity = 0
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+# the eight corners of a cell, for cloud-in-cell weights
+_CORNERS = [(a, b, c) for a in (0, 1) for b in (0, 1) for c in (0, 1)]
+
+
+class ParticleMesh:
+    # the poisson solve is over the whole mesh whatever the targets,
+    # splitting the targets over worker processes would repeat it
+    shardable = False
+
+    def __init__(self, grid=64, n_direct=1):
+        # number of mesh points per axis, the mesh spans
+        # the bounding box of the bodies
+        self.grid = grid
+
+        # the first n_direct bodies (the black hole) are not deposited on
+        # the mesh, their attraction is summed exactly instead
+        self.n_direct = n_direct
+
+        # mesh cell width of the last solve, and duration of each phase
+        self.h = 0.0
+        self.timings = {}
+
+        # the potential includes the (smoothed) self energy
+        # of every body on the mesh
+        self.potential = False
+        self.phi = None
+
+        self._green = {}
+
+    def _green_hat(self, n):
+        # fourier transform of the 1 / r kernel on the zero-padded
+        # (2n)^3 mesh, in cell units: padding makes the convolution
+        # non-periodic (isolated boundaries)
+        if n not in self._green:
+            k = np.arange(2 * n)
+            k = np.minimum(k, 2 * n - k).astype(float)
+            r = np.sqrt(
+                k[:, None, None] ** 2 + k[None, :, None] ** 2 + k[None, None, :] ** 2
+            )
+
+            # soften the kernel to one cell at the origin
+            r[0, 0, 0] = 0.5
+            self._green[n] = np.fft.rfftn(1 / r)
+
+        return self._green[n]
+
+    def __call__(self, s, m, G, targets=None):
+        if targets is None:
+            targets = np.arange(len(s))
+        n = self.grid
+
+        # the renderer reads the timings while the solver runs, they are
+        # published all at once at the end
+        timings = {}
+
+        # bodies on the mesh, and mesh placement:
+        # one cell of margin, so that all corners stay on the mesh
+        s_mesh, m_mesh = s[self.n_direct :], m[self.n_direct :]
+        if len(s_mesh):
+            lo, hi = s_mesh.min(axis=0), s_mesh.max(axis=0)
+        else:
+            lo, hi = np.zeros(3), np.ones(3)
+        self.h = h = max(float((hi - lo).max()), 1e-6) / (n - 3)
+        lo = lo - h
+
+        # cloud-in-cell mass deposition
+        start = time.perf_counter()
+        rho = np.zeros(n**3)
+        for corner, weight in self._cic(s_mesh, lo, h):
+            rho += np.bincount(corner, m_mesh * weight, minlength=n**3)
+        timings["deposit"] = time.perf_counter() - start
+
+        # poisson solve, phi = -G * (rho conv 1 / r), then
+        # the acceleration field is -grad phi, by central differences
+        start = time.perf_counter()
+        rho_hat = np.fft.rfftn(rho.reshape(n, n, n), s=(2 * n,) * 3, axes=(0, 1, 2))
+        phi = np.fft.irfftn(
+            rho_hat * self._green_hat(n), s=(2 * n,) * 3, axes=(0, 1, 2)
+        )
+        phi = -G / h * phi[:n, :n, :n]
+        field = -np.stack(np.gradient(phi, h), axis=-1).reshape(-1, 3)
+        phi = phi.reshape(-1)
+        timings["solve"] = time.perf_counter() - start
+
+        # interpolate the field back to the targets, with the same weights
+        start = time.perf_counter()
+        p = s[targets]
+        a = np.zeros((len(p), 3))
+        phi_p = np.zeros(len(p)) if self.potential else None
+        for corner, weight in self._cic(p, lo, h):
+            a += field[corner] * weight[:, np.newaxis]
+            if phi_p is not None:
+                phi_p += phi[corner] * weight
+        timings["interpolate"] = time.perf_counter() - start
+
+        # exact attraction of the direct bodies
+        start = time.perf_counter()
+        for j in range(min(self.n_direct, len(s))):
+            ds = s[j] - p
+            d2 = np.maximum(np.einsum("ij,ij->i", ds, ds), 1e-6)
+            w = m[j] / (d2 * np.sqrt(d2))
+            w[targets == j] = 0
+            a += G * w[:, np.newaxis] * ds
+            if phi_p is not None:
+                phi_p -= G * np.where(targets == j, 0, m[j] / np.sqrt(d2))
+        timings["direct"] = time.perf_counter() - start
+
+        self.timings = timings
+        self.phi = phi_p
+        return a
+
+    def _cic(self, p, lo, h):
+        # flat mesh index and weight of the eight corners
+        # of the cell holding every position
+        n = self.grid
+        u = np.clip((p - lo) / h, 0, n - 1 - 1e-9)
+        i0 = np.floor(u).astype(int)
+        f = u - i0
+
+        base = (i0[:, 0] * n + i0[:, 1]) * n + i0[:, 2]
+        w = (1 - f, f)
+        for a, b, c in _CORNERS:
+            yield base + (a * n + b) * n + c, w[a][:, 0] * w[b][:, 1] * w[c][:, 2]
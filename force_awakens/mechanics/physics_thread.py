@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from queue import Empty, SimpleQueue
+
+import numpy as np
+
+from force_awakens.mechanics.integrators import FixedStep
+
+# state of the active bodies after a batch of steps, as read-only copies,
+# stamped with the wall clock time it was published at, with the id of
+# every body to find its render call, and the positions of the tracers
+Snapshot = namedtuple("Snapshot", ["wall", "s", "m", "r", "decay", "ids", "tracers"])
+
+
+def _frozen(array):
+    array = array.copy()
+    array.flags.writeable = False
+    return array
+
+
+class PhysicsThread(threading.Thread):
+    def __init__(self, engine, tracers=None, **clock_args):
+        super().__init__(name="physics", daemon=True)
+
+        # the engine is only ever touched by this thread,
+        # other threads go through submit()
+        self.engine = engine
+        self.clock = FixedStep(engine, **clock_args)
+
+        # massless particles moved by the bodies, on their own time step
+        self.tracers = tracers
+
+        self._commands = SimpleQueue()
+        self._halt = threading.Event()
+
+        # the last two snapshots, replaced as one tuple so that
+        # readers always see a consistent pair without locking
+        snapshot = self._snapshot()
+        self.published = (snapshot, snapshot)
+
+        # steps run, and force evaluations of the last batch
+        self.steps = 0
+        self.evaluations = 0
+
+    def _snapshot(self):
+        engine = self.engine
+        n = engine.n
+        return Snapshot(
+            time.perf_counter(),
+            _frozen(engine.s[:n]),
+            _frozen(engine.m[:n]),
+            _frozen(engine.r[:n]),
+            _frozen(engine.decay[:n]),
+            _frozen(engine.ids[:n]),
+            None if self.tracers is None else _frozen(self.tracers.positions()),
+        )
+
+    def submit(self, fn):
+        # run fn(engine) on the physics thread, between two steps
+        future = Future()
+        self._commands.put((fn, future))
+        return future
+
+    def _run_commands(self):
+        while True:
+            try:
+                fn, future = self._commands.get_nowait()
+            except Empty:
+                return
+            try:
+                future.set_result(fn(self.engine))
+            except Exception as e:
+                future.set_exception(e)
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._halt.is_set():
+            self._run_commands()
+
+            now = time.perf_counter()
+            evaluations = self.engine.evaluations
+            steps = self.clock.advance(now - last)
+            last = now
+
+            if steps:
+                self.steps += steps
+                self.evaluations = self.engine.evaluations - evaluations
+
+                if self.tracers is not None:
+                    engine = self.engine
+                    self.tracers.advance(
+                        steps * self.clock.h,
+                        engine.s[: engine.n],
+                        engine.m[: engine.n],
+                        engine.G,
+                    )
+                self.published = (self.published[1], self._snapshot())
+            else:
+                # sleep until the next step is due
+                clock = self.clock
+                due = (clock.h - clock.accumulator) / max(clock.warp, 1e-3)
+                time.sleep(min(max(due, 0.0), 0.01))
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def positions(self, now=None):
+        # positions interpolated between the last two snapshots,
+        # rendering one snapshot behind the simulation
+        if now is None:
+            now = time.perf_counter()
+        prev, latest = self.published
+
+        span = latest.wall - prev.wall
+        if span <= 0:
+            return latest, latest.s
+
+        # bodies are matched by id, as removals move them between snapshots,
+        # and bodies added since the previous snapshot are not interpolated
+        lookup = np.full(
+            max(prev.ids.max(initial=0), latest.ids.max(initial=0)) + 1, -1
+        )
+        lookup[prev.ids] = np.arange(len(prev.ids))
+        i = lookup[latest.ids]
+        s_prev = np.where((i >= 0)[:, np.newaxis], prev.s[i], latest.s)
+
+        alpha = np.clip((now - latest.wall) / span, 0.0, 1.0)
+        return latest, s_prev + (latest.s - s_prev) * alpha
@@ -0,0 +1,121 @@
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def predict(s, v, s_bodies, m_bodies, G, horizon=3.0, h=1 / 60, r_stop=1.0):
+    # path of a test particle launched from s with velocity v, against
+    # bodies frozen in place, until horizon or until it reaches r_stop
+    # of the black hole (the first body)
+    n = int(horizon / h)
+    path = np.empty((n + 1, 3))
+    path[0] = s
+    s, v = np.array(s, dtype=float), np.array(v, dtype=float)
+    gm = G * m_bodies
+
+    def acceleration(s):
+        ds = s_bodies - s
+        d2 = np.maximum(np.einsum("ij,ij->i", ds, ds), 1e-6)
+        return (gm / (d2 * np.sqrt(d2))) @ ds
+
+    # kick-drift-kick leapfrog
+    a = acceleration(s)
+    for i in range(1, n + 1):
+        v += a * (h / 2)
+        s += v * h
+        a = acceleration(s)
+        v += a * (h / 2)
+        path[i] = s
+
+        if np.linalg.norm(s - s_bodies[0]) < r_stop:
+            return path[: i + 1]
+
+    return path
+
+
+class Predictor(threading.Thread):
+    def __init__(self, G, horizon=3.0, h=1 / 60, max_age=0.5, size=16):
+        super().__init__(name="predictor", daemon=True)
+
+        # paths are integrated for horizon simulated seconds, by steps of h
+        self.G = G
+        self.horizon = horizon
+        self.h = h
+
+        # a path older than max_age wall clock seconds is recomputed
+        # in the background, and returned meanwhile
+        self.max_age = max_age
+
+        # last paths computed, by launch parameters
+        self.size = size
+        self.cache = OrderedDict()
+
+        # only the latest request is kept, older ones are outdated,
+        # the condition also guards the cache, shared with the renderer
+        self._request = None
+        self._ready = threading.Condition()
+        self._halt = False
+
+    @staticmethod
+    def key(s, v, precision=1e-2):
+        # launch parameters rounded, so that a still camera hits the cache
+        return tuple(np.round(np.concatenate([s, v]) / precision).astype(int))
+
+    def path(self, s, v, snapshot, r_stop=1.0, now=None):
+        # path of the body launched from s with velocity v: never waits for
+        # the worker, until it is ready the last path computed is returned
+        # (None before the first one)
+        if now is None:
+            now = time.perf_counter()
+        key = self.key(s, v)
+
+        with self._ready:
+            cached = self.cache.get(key)
+            if cached is None or now - cached[0] > self.max_age:
+                self._request = (key, s, v, snapshot, r_stop, now)
+                self._ready.notify()
+
+            if cached is not None:
+                self.cache.move_to_end(key)
+            elif self.cache:
+                cached = self.cache[next(reversed(self.cache))]
+            else:
+                return None
+
+        return cached[1]
+
+    def run(self):
+        while True:
+            with self._ready:
+                while self._request is None and not self._halt:
+                    self._ready.wait()
+                if self._halt:
+                    return
+                request, self._request = self._request, None
+
+            # bodies frozen at the snapshot of the request
+            key, s, v, snapshot, r_stop, now = request
+            path = predict(
+                s,
+                v,
+                snapshot.s,
+                snapshot.m,
+                self.G,
+                horizon=self.horizon,
+                h=self.h,
+                r_stop=r_stop,
+            )
+
+            with self._ready:
+                self.cache[key] = (now, path)
+                self.cache.move_to_end(key)
+                while len(self.cache) > self.size:
+                    self.cache.popitem(last=False)
+
+    def stop(self):
+        with self._ready:
+            self._halt = True
+            self._ready.notify()
+        self.join()
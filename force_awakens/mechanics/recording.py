@@ -0,0 +1,306 @@
+import atexit
+import mmap
+import struct
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from force_awakens.mechanics.physics_thread import Snapshot
+
+# file layout: the magic, then chunks of frames appended one after the other,
+# and on close, an index of the chunk offsets followed by the footer
+_MAGIC = b"FAREC001"
+_FOOTER = struct.Struct("<QQ8s")
+_FOOTER_MAGIC = b"FAINDEX1"
+
+# chunk header: number of frames, flags, and payload size, followed
+# by the frame table (uncompressed) and the payload (maybe compressed)
+_CHUNK = struct.Struct("<IIQ")
+_COMPRESSED = 1
+
+# per frame, its simulated time, number of bodies, largest id + 1,
+# and whether its bits are xored with the previous frame
+_TABLE = np.dtype([("time", "<f8"), ("n", "<i4"), ("top", "<i4"), ("delta", "<i4")])
+_INDEX = np.dtype([("frame", "<u8"), ("offset", "<u8")])
+
+# per body, the position, velocity, mass, radius and decay as float32,
+# after the ids of the bodies of the frame as int32
+_COLUMNS = 9
+
+Frame = namedtuple("Frame", ["time", "ids", "s", "v", "m", "r", "decay"])
+
+
+class Recorder:
+    def __init__(self, path, chunk=64, compress=True, delta=True, level=1):
+        # frames are buffered by chunks of chunk frames, and every
+        # chunk is compressed and written by a writer thread
+        self.chunk = chunk
+        self.compress = compress
+        self.level = level
+
+        # xor the bits of a frame with the bits of the previous frame
+        # when the bodies are the same, slowly moving values then share
+        # most of their bits, which compresses well
+        self.delta = delta
+
+        self.file = open(path, "wb")
+        self.file.write(_MAGIC)
+        self.offset = len(_MAGIC)
+
+        self.frames = []
+        self.n_frames = 0
+        self.index = []
+
+        self._writer = ThreadPoolExecutor(max_workers=1)
+
+        # closed at exit when the app stops without closing it, the
+        # frames of the last chunk would be lost otherwise
+        atexit.register(self.close)
+
+    def record(self, engine):
+        # copy the active bodies of the engine as a new frame
+        n = engine.n
+        block = np.empty((n, _COLUMNS), dtype=np.float32)
+        block[:, 0:3] = engine.s[:n]
+        block[:, 3:6] = engine.v[:n]
+        block[:, 6] = engine.m[:n]
+        block[:, 7] = engine.r[:n]
+        block[:, 8] = engine.decay[:n]
+        ids = engine.ids[:n].astype(np.int32)
+
+        self.frames.append((engine.time, ids, block))
+        if len(self.frames) == self.chunk:
+            self._flush()
+
+    def _flush(self):
+        if not self.frames:
+            return
+        frames, self.frames = self.frames, []
+
+        # encoded and written on the writer thread, the recording thread
+        # only hands over the frames
+        self._writer.submit(self._write, frames, self.n_frames)
+        self.n_frames += len(frames)
+
+    def _write(self, frames, first):
+        # the writer thread owns the file offset and the index
+        chunk = self._encode(frames)
+        self.index.append((first, self.offset))
+        self.offset += len(chunk)
+        self.file.write(chunk)
+
+    def _encode(self, frames):
+        table = np.zeros(len(frames), dtype=_TABLE)
+        parts = []
+        prev = None
+        for i, (t, ids, block) in enumerate(frames):
+            bits = block.view(np.uint32)
+            delta = self.delta and prev is not None and np.array_equal(prev[0], ids)
+            table[i] = (t, len(ids), ids.max(initial=-1) + 1, delta)
+            parts.append(ids.tobytes())
+            parts.append((bits ^ prev[1] if delta else bits).tobytes())
+            prev = ids, bits
+
+        payload = b"".join(parts)
+        flags = 0
+        if self.compress:
+            payload = zlib.compress(payload, self.level)
+            flags |= _COMPRESSED
+
+        header = _CHUNK.pack(len(frames), flags, len(payload))
+        return header + table.tobytes() + payload
+
+    def close(self):
+        # write the last frames, and the index of the chunks
+        if self.file.closed:
+            return
+        atexit.unregister(self.close)
+
+        # the last chunk is written on this thread, at exit the writer
+        # no longer takes new work
+        self._writer.shutdown(wait=True)
+        if self.frames:
+            self._write(self.frames, self.n_frames)
+            self.n_frames += len(self.frames)
+            self.frames = []
+
+        index = np.array(self.index, dtype=_INDEX)
+        self.file.write(index.tobytes())
+        self.file.write(_FOOTER.pack(self.offset, len(index), _FOOTER_MAGIC))
+        self.file.close()
+
+
+class Recording:
+    def __init__(self, path):
+        # the file is memory mapped, uncompressed frames are
+        # read in place, without copies
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a recording")
+
+        index = self._index()
+        self.chunk_offset = index["offset"].astype(int)
+
+        # frame table of every chunk, to seek any frame by its number or time
+        tables = [self._table(offset)[1] for offset in self.chunk_offset]
+        self.times = np.concatenate([table["time"] for table in tables] + [[]])
+        self.chunk_first = index["frame"].astype(int)
+        if not len(self.times):
+            # nothing to replay, the map is released before raising
+            del index, tables
+            self.close()
+            raise ValueError(f"{path} holds no frames")
+
+        # number of ids used by the bodies, over all frames
+        self.n_ids = max((int(table["top"].max()) for table in tables), default=0)
+
+        # the last chunks decoded, a replay reads from two chunks
+        # when it interpolates across a chunk boundary
+        self._cache = {}
+
+    def _index(self):
+        # index written on close, or when the recording was not closed,
+        # rebuilt by walking the chunks, dropping an incomplete last chunk
+        end = len(self.map) - _FOOTER.size
+        if end >= len(_MAGIC):
+            offset, n_chunks, magic = _FOOTER.unpack_from(self.map, end)
+            if magic == _FOOTER_MAGIC:
+                return np.frombuffer(
+                    self.map, dtype=_INDEX, count=n_chunks, offset=offset
+                )
+
+        index = []
+        offset, frame = len(_MAGIC), 0
+        while offset + _CHUNK.size <= len(self.map):
+            n_frames, _, size = _CHUNK.unpack_from(self.map, offset)
+            end = offset + _CHUNK.size + n_frames * _TABLE.itemsize + size
+            if end > len(self.map):
+                break
+            index.append((frame, offset))
+            offset, frame = end, frame + n_frames
+
+        return np.array(index, dtype=_INDEX)
+
+    def _table(self, offset):
+        n_frames, flags, size = _CHUNK.unpack_from(self.map, offset)
+        start = offset + _CHUNK.size
+        table = np.frombuffer(self.map, dtype=_TABLE, count=n_frames, offset=start)
+        start += table.nbytes
+        return flags, table, start, size
+
+    def __len__(self):
+        return len(self.times)
+
+    def _chunk(self, c):
+        # decode every frame of chunk c
+        if c in self._cache:
+            return self._cache[c]
+
+        flags, table, start, size = self._table(self.chunk_offset[c])
+        payload = memoryview(self.map)[start : start + size]
+        if flags & _COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        frames = []
+        offset, prev = 0, None
+        for t, n, _, delta in table:
+            ids = np.frombuffer(payload, dtype=np.int32, count=n, offset=offset)
+            offset += ids.nbytes
+            bits = np.frombuffer(
+                payload, dtype=np.uint32, count=n * _COLUMNS, offset=offset
+            ).reshape(n, _COLUMNS)
+            offset += bits.nbytes
+
+            if delta:
+                bits = bits ^ prev
+            prev = bits
+
+            block = bits.view(np.float32)
+            frames.append(
+                Frame(
+                    t,
+                    ids,
+                    block[:, 0:3],
+                    block[:, 3:6],
+                    block[:, 6],
+                    block[:, 7],
+                    block[:, 8],
+                )
+            )
+
+        if len(self._cache) >= 2:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[c] = frames
+        return frames
+
+    def frame(self, i):
+        # frame number i, decoding at most one chunk
+        c = np.searchsorted(self.chunk_first, i, side="right") - 1
+        return self._chunk(c)[i - self.chunk_first[c]]
+
+    def seek(self, t):
+        # number of the last frame at or before simulated time t
+        return max(int(np.searchsorted(self.times, t, side="right")) - 1, 0)
+
+    def close(self):
+        # arrays may still point into the map, it is closed once they are freed
+        self._cache = {}
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+        self.file.close()
+
+
+class Replay:
+    def __init__(self, recording, speed=1.0):
+        # plays a recording in place of the physics thread,
+        # simulated seconds per wall clock second
+        self.recording = recording
+        self.speed = speed
+
+        self.time = recording.times[0] if len(recording) else 0.0
+        self.frame = 0
+        self._last = None
+
+    def start(self):
+        self._last = time.perf_counter()
+
+    def stop(self):
+        self.recording.close()
+
+    def seek(self, frame):
+        self.frame = min(max(frame, 0), len(self.recording) - 1)
+        self.time = self.recording.times[self.frame]
+
+    def positions(self, now=None):
+        # frame at the current replay time, positions interpolated towards
+        # the next frame when it has the same bodies
+        if now is None:
+            now = time.perf_counter()
+        if self._last is not None:
+            self.time += (now - self._last) * self.speed
+        self._last = now
+
+        recording = self.recording
+        self.frame = recording.seek(self.time)
+        if self.frame == len(recording) - 1:
+            self.time = recording.times[-1]
+
+        frame = recording.frame(self.frame)
+        s = frame.s
+        if self.frame + 1 < len(recording):
+            after = recording.frame(self.frame + 1)
+            span = after.time - frame.time
+            if span > 0 and np.array_equal(after.ids, frame.ids):
+                alpha = (self.time - frame.time) / span
+                s = frame.s + (after.s - frame.s) * np.clip(alpha, 0.0, 1.0)
+
+        snapshot = Snapshot(
+            now, frame.s, frame.m, frame.r, frame.decay, frame.ids, None
+        )
+        return snapshot, s
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class BodyStore:
+    def __init__(self, fields, capacity=64):
+        # struct of arrays, one array per field, with a shape per body
+        # and a dtype: active bodies are always the first n entries
+        self.fields = dict(fields)
+        self.capacity = capacity
+        self.n = 0
+
+        for name, (shape, dtype) in self.fields.items():
+            setattr(self, name, np.zeros((capacity, *shape), dtype=dtype))
+
+        # bodies keep a stable id for their whole life, which indexes the
+        # render calls: id of every entry, and entry of every id (-1 if free)
+        self.ids = np.zeros(capacity, dtype=int)
+        self.entry = np.full(capacity, -1, dtype=int)
+
+        # ids of removed bodies, reused before new ids are handed out
+        self.free = []
+        self.next_id = 0
+
+    def reserve(self, n):
+        # double the capacity until n bodies fit, copying the active bodies over
+        capacity = self.capacity
+        while capacity < n:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        self.capacity = capacity
+
+        for name, (shape, dtype) in self.fields.items():
+            array = np.zeros((capacity, *shape), dtype=dtype)
+            array[: self.n] = getattr(self, name)[: self.n]
+            setattr(self, name, array)
+
+        self.ids = np.resize(self.ids, capacity)
+        entry = np.full(capacity, -1, dtype=int)
+        entry[: len(self.entry)] = self.entry
+        self.entry = entry
+
+    def append(self, **values):
+        # add a body at the end of the active bodies, and return its id
+        self.reserve(self.n + 1)
+
+        if self.free:
+            id_ = self.free.pop()
+        else:
+            id_ = self.next_id
+            self.next_id += 1
+
+        i = self.n
+        self.n += 1
+        for name, (shape, dtype) in self.fields.items():
+            getattr(self, name)[i] = values.get(name, 0)
+        self.ids[i] = id_
+        self.entry[id_] = i
+
+        return id_
+
+    def remove(self, idx):
+        # remove the bodies at entries idx, compacting the remaining
+        # bodies into the first entries, preserving their order
+        keep = np.ones(self.n, dtype=bool)
+        keep[idx] = False
+        if np.all(keep):
+            return
+
+        removed = self.ids[: self.n][~keep]
+        self.entry[removed] = -1
+        self.free.extend(removed[::-1].tolist())
+
+        keep = np.flatnonzero(keep)
+        for name in self.fields:
+            array = getattr(self, name)
+            array[: len(keep)] = array[keep]
+        self.ids[: len(keep)] = self.ids[keep]
+        self.n = len(keep)
+        self.entry[self.ids[: self.n]] = np.arange(self.n)
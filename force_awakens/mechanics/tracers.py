@@ -0,0 +1,106 @@
+import numpy as np
+
+from force_awakens.mechanics.integrators import FixedStep
+
+
+def _stars(n):
+    # positions denser close to the black hole with the sine term,
+    # and diffused further away with the tangent term
+    stars = np.random.random((n, 3)) * 5 - 2.5
+    return (np.sin(stars) - 1.1) * np.tan(stars)
+
+
+class Tracers:
+    def __init__(self, engine, n=32768, h=1 / 30, max_steps=4, eps=0.5, chunk=16384):
+        # massless test particles, moved by the gravity of the bodies
+        # of the engine but exerting none (restricted n-body):
+        # the cost is O(n * bodies) instead of O((n + bodies)^2)
+        self.n = n
+
+        # tracers step by h, independently of the bodies: a longer step
+        # keeps them within the frame budget, and the accumulated time
+        # not yet simulated is drifted over for rendering
+        self.clock = FixedStep(self, h, max_steps)
+        self.bodies = None
+
+        # softening length, tracers are drawn as points, and the orbits
+        # closest to the black hole would otherwise need a smaller step
+        self.eps = eps
+
+        # tracers are processed in chunks, so that the distance arrays
+        # never hold more than chunk x bodies entries
+        self.chunk = chunk
+
+        # single precision is plenty for points on screen, and
+        # halves the memory traffic of every step
+        self.s = _stars(n).astype(np.float32)
+
+        # circular orbits around the black hole, all turning in the same
+        # sense around the x axis, as the rotating stars did
+        G, m = engine.G, engine.m[0]
+        d = np.linalg.norm(self.s, axis=1)
+        d2 = d**2 + eps**2
+        direction = np.cross([1.0, 0.0, 0.0], self.s)
+        norm = np.linalg.norm(direction, axis=1)
+        direction[norm == 0] = [0.0, 1.0, 0.0]
+        norm[norm == 0] = 1.0
+        speed = np.sqrt(G * m * d**2 / (d2 * np.sqrt(d2)))
+        self.v = (direction * (speed / norm)[:, np.newaxis]).astype(np.float32)
+
+        self.a = self.accelerations(engine.s[: engine.n], engine.m[: engine.n], G)
+
+    def accelerations(self, s, m, G):
+        # acceleration of every tracer due to the bodies s
+        # |p - s|^2 = |p|^2 + |s|^2 - 2 p.s is one matrix product per chunk,
+        # with [p, |p|^2, 1] against [-2 s, 1, |s|^2 + eps^2]
+        s = s.astype(np.float32)
+        m = (G * m).astype(np.float32)
+        src = np.empty((len(s), 5), dtype=np.float32)
+        src[:, :3] = -2 * s
+        src[:, 3] = 1
+        src[:, 4] = np.einsum("ij,ij->i", s, s) + self.eps**2
+
+        # sum(w * s) and sum(w) are also one matrix product, with [s, 1]
+        src_w = np.ones((len(s), 4), dtype=np.float32)
+        src_w[:, :3] = s
+
+        dst = np.ones((min(self.chunk, self.n), 5), dtype=np.float32)
+        a = np.empty_like(self.s)
+        for i in range(0, self.n, self.chunk):
+            p = self.s[i : i + self.chunk]
+            q = dst[: len(p)]
+            q[:, :3] = p
+            q[:, 3] = np.einsum("ij,ij->i", p, p)
+
+            # w = G m / d^3, kept finite for the softened distance
+            d = q @ src.T
+            np.maximum(d, np.float32(1e-6), out=d)
+            w = np.sqrt(d)
+            w *= d
+            np.divide(m, w, out=w)
+
+            # a = sum(w * (s - p)) = sum(w * s) - p * sum(w)
+            r = w @ src_w
+            a[i : i + self.chunk] = r[:, :3] - p * r[:, 3:]
+
+        return a
+
+    def step(self, dt):
+        # kick-drift-kick leapfrog, one force evaluation per step,
+        # the accelerations of the last step are reused for the first kick
+        s, m, G = self.bodies
+        dt = np.float32(dt)
+        self.v += self.a * (dt / 2)
+        self.s += self.v * dt
+        self.a = self.accelerations(s, m, G)
+        self.v += self.a * (dt / 2)
+
+    def advance(self, dt, s, m, G):
+        # run as many steps of h as fit in dt simulated seconds, in the
+        # gravity of the bodies s, returns the number of steps run
+        self.bodies = s, m, G
+        return self.clock.advance(dt)
+
+    def positions(self):
+        # positions drifted to the end of the simulated time
+        return self.s + self.v * np.float32(self.clock.accumulator)
@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+
+from force_awakens.mechanics.checkpoint import capture, load, restore_engine, save
+from force_awakens.mechanics.diagnostics import Diagnostics
+from force_awakens.mechanics.engine import Engine
+from force_awakens.mechanics.ensemble import Ensemble
+from force_awakens.mechanics.recording import Recorder
+from force_awakens.mechanics.tracers import Tracers
+
+
+def _drift(diagnostics):
+    energy, momentum, angular = diagnostics.drift()
+    return (
+        f"  drift: energy {energy:.3e}, momentum {momentum:.3e}, "
+        f"angular momentum {angular:.3e}"
+    )
+
+
+# run the engine without a window, and report its throughput
+def run(
+    n_body=1024,
+    steps=600,
+    dt=1 / 120,
+    seed=None,
+    solver="direct",
+    integrator="leapfrog",
+    backend="auto",
+    kepler=0.0,
+    tracers=0,
+    record=None,
+    checkpoint=None,
+    restore=None,
+    diagnostics=60,
+    report=60,
+):
+    np.random.seed(seed)
+
+    engine = Engine(
+        n_body=n_body,
+        capacity=n_body,
+        solver=solver,
+        integrator=integrator,
+        backend=backend,
+        kepler=kepler,
+    )
+
+    # optionally, continues from a checkpoint, with as many tracers
+    if restore:
+        state = load(restore)
+        if "tracer_s" in state:
+            tracers = len(state["tracer_s"])
+
+    if tracers:
+        tracers = Tracers(engine, tracers)
+    else:
+        tracers = None
+    if restore:
+        restore_engine(engine, state, tracers)
+    if record:
+        engine.recorder = Recorder(record)
+    if diagnostics:
+        engine.diagnostics = Diagnostics(diagnostics)
+
+    print(
+        f"{engine.n} bodies, {steps} steps of {dt * 1000:.2f} ms, "
+        f"{type(engine.solver).__name__} solver, {integrator} integrator, "
+        f"{engine.backend.name} backend"
+    )
+
+    # bodies may merge or decay, count the bodies of every step
+    body_steps = 0
+    start = time.perf_counter()
+    for step in range(1, steps + 1):
+        body_steps += engine.n
+        engine.step(dt)
+        if tracers is not None:
+            tracers.advance(dt, engine.s[: engine.n], engine.m[: engine.n], engine.G)
+
+        if report and step % report == 0:
+            wall = time.perf_counter() - start
+            print(
+                f"step {step}: {engine.n} bodies, {body_steps / wall:.4g} body-steps/s"
+            )
+            if kepler:
+                print(f"  {engine.n_kepler} bodies on keplerian orbits")
+            if diagnostics:
+                print(_drift(engine.diagnostics))
+
+    wall = time.perf_counter() - start
+    if record:
+        engine.recorder.close()
+    if checkpoint:
+        save(checkpoint, capture(engine, tracers))
+    print(f"{steps} steps in {wall:.3f} s, {steps / wall:.2f} steps/s")
+    print(f"{body_steps / wall:.4g} body-steps/s")
+    print(f"{engine.evaluations / wall:.4g} force evaluations/s")
+    if hasattr(engine.solver, "costs"):
+        print(f"autotuned: {engine.solver.choice}")
+        for name, cost in sorted(engine.solver.costs.items(), key=lambda c: c[1]):
+            print(f"  {name}: {cost * 1000:.3f} ms per force pass")
+    if hasattr(engine.solver, "close"):
+        engine.solver.close()
+    if diagnostics and engine.diagnostics.samples:
+        first, last = engine.diagnostics.first, engine.diagnostics.samples[-1]
+        print(
+            f"energy {first.energy:.6g} at {first.time:.3f} s, "
+            f"{last.energy:.6g} at {last.time:.3f} s"
+        )
+        print(_drift(engine.diagnostics))
+
+    return body_steps / wall
+
+
+# run many small systems together, and report their throughput
+def run_ensemble(n_scenario=1000, n_body=16, steps=600, dt=1 / 120, seed=None):
+    np.random.seed(seed)
+    ensemble = Ensemble(n_scenario, n_body)
+
+    print(
+        f"{n_scenario} scenarios of {n_body} bodies, {steps} steps of "
+        f"{dt * 1000:.2f} ms, batched direct sum, leapfrog integrator"
+    )
+
+    body_steps = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        body_steps += int(ensemble.mask.sum())
+        ensemble.step(dt)
+
+    wall = time.perf_counter() - start
+    survivors = ensemble.survivors()
+    print(f"{steps} steps in {wall:.3f} s, {steps / wall:.2f} steps/s")
+    print(f"{body_steps / wall:.4g} body-steps/s")
+    print(
+        f"bodies left per scenario: {survivors.min()} to {survivors.max()}, "
+        f"{survivors.mean():.2f} on average"
+    )
+
+    return body_steps / wall